@@ -12,7 +12,7 @@ def create_app():
     app.config.from_object('back_end.config.Config')
 
     # Enable CORS
-    CORS(app, origins=["http://localhost:3000"])
+    CORS(app, origins=["http://localhost:3000"], expose_headers=["X-Chat-Session"])
 
     # Register blueprints
     from back_end.routes.retrieve_lesson_content import retrieve_lesson_bp
@@ -20,11 +20,13 @@ def create_app():
     from back_end.routes.chat import chat_bp
     from back_end.routes.complete_lesson import complete_bp
     from back_end.routes.courses import courses_bp
+    from back_end.routes.metrics import metrics_bp
 
     app.register_blueprint(courses_bp)
     app.register_blueprint(complete_bp)
     app.register_blueprint(generate_course_bp)
     app.register_blueprint(chat_bp)
     app.register_blueprint(retrieve_lesson_bp)
+    app.register_blueprint(metrics_bp)
 
     return app
@@ -0,0 +1,208 @@
+# back_end/asgi.py
+"""
+Async serving path for the chat and lesson retrieval endpoints.
+
+A chat stream here is a coroutine waiting on the model rather than a Flask
+worker thread, so a single process holds as many concurrent sessions as the
+event loop and the shared HTTP pool allow. It shares create_app()'s config and
+the prompt/session helpers of the Flask routes. Run it next to the Flask app:
+
+    uvicorn back_end.asgi:app --port 5001
+
+Requires the optional `starlette` and `uvicorn` packages.
+"""
+
+import asyncio
+import contextlib
+from functools import wraps
+import httpx
+from langchain_openai import ChatOpenAI
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+from back_end import create_app
+from back_end.extensions.firebase import async_db
+from back_end.routes.chat import build_chat_messages, lesson_reference, prepare_history
+from back_end.routes.retrieve_lesson_content import with_content
+from back_end.tasks.worker import release_upcoming_modules, unreleased_window
+from back_end.utils.auth import verify_token
+from back_end.utils.chat_sessions import append_turn
+from back_end.utils.lesson_context import aget_lesson_context
+from back_end.utils.rate_limit import AsyncRateLimitedTransport
+from back_end.utils.sse import acoalesced_events, sse_event
+
+flask_app = create_app()
+config = flask_app.config
+
+# per-process async clients, built in lifespan() on the server's event loop
+resources = {}
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    http = httpx.AsyncClient(
+        timeout=httpx.Timeout(config['HTTP_TIMEOUT']),
+        transport=AsyncRateLimitedTransport(httpx.AsyncHTTPTransport(limits=httpx.Limits(
+            max_connections=config['ASYNC_HTTP_MAX_CONNECTIONS'],
+            max_keepalive_connections=config['ASYNC_HTTP_MAX_CONNECTIONS'],
+        ))),
+    )
+    resources["chat_llm"] = ChatOpenAI(
+        model=config['CHAT_MODEL_NAME'],
+        streaming=True,
+        stream_usage=True,
+        api_key=config['OPENROUTER_API_KEY'],
+        base_url="https://openrouter.ai/api/v1",
+        http_async_client=http,
+    )
+    try:
+        yield
+    finally:
+        resources.clear()
+        await http.aclose()
+
+def json_response(data, status_code: int = 200) -> Response:
+    # Flask's JSON provider, so payloads are identical to the Flask routes
+    return Response(flask_app.json.dumps(data), status_code=status_code, media_type="application/json")
+
+def require_auth(endpoint):
+    """
+    Async counterpart of back_end.utils.auth.require_auth; the caller's uid is `request.state.uid`.
+    """
+    @wraps(endpoint)
+    async def wrapper(request: Request):
+        auth_header = request.headers.get('Authorization', '')
+        if not auth_header.startswith('Bearer '):
+            return json_response({"error": 'Missing or malformed Authorization header'}, 401)
+
+        try:
+            decoded = await asyncio.to_thread(verify_token, auth_header.split('Bearer ')[1])
+        except Exception as e:
+            flask_app.logger.warning(f'Token verification failed: {e!r}')
+            return json_response({"error": 'Invalid auth token'}, 401)
+
+        request.state.uid = decoded['uid']
+        return await endpoint(request)
+
+    return wrapper
+
+@require_auth
+async def chat(request: Request):
+    uid = request.state.uid
+    try:
+        payload = await request.json()
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict):
+        payload = {}
+
+    # session bookkeeping is a few Redis round trips; keep it off the event loop
+    try:
+        raw_msgs, session_id, summary = await asyncio.to_thread(prepare_history, uid, payload)
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+
+    with flask_app.app_context():
+        lesson_context = None
+        ids = lesson_reference(payload)
+        try:
+            if ids:
+                lesson_context = await aget_lesson_context(uid, *ids)
+        except Exception as e:
+            flask_app.logger.error(f"Error fetching reference data: {e}")
+        # may embed the question for retrieval, which is CPU-bound
+        chain_msgs = await asyncio.to_thread(build_chat_messages, raw_msgs, summary, lesson_context)
+
+    llm = resources["chat_llm"]
+    reply = []
+
+    # On client disconnect Starlette cancels the response task, which cancels
+    # the pending astream() read and with it the upstream request.
+    async def generate():
+        async for chunk in llm.astream(chain_msgs, user=uid):
+            reply.append(chunk.content)
+            yield chunk.content.encode('utf-8')
+        if session_id:
+            await asyncio.to_thread(append_turn, uid, session_id, 'bot', "".join(reply))
+
+    async def generate_sse():
+        try:
+            async for event in acoalesced_events(
+                llm.astream(chain_msgs, user=uid),
+                window=config['CHAT_SSE_COALESCE_MS'] / 1000,
+                max_chars=config['CHAT_SSE_COALESCE_CHARS'],
+                heartbeat=config['CHAT_SSE_HEARTBEAT_SECONDS'],
+                on_text=reply.append,
+            ):
+                yield event
+        except Exception as e:
+            flask_app.logger.error(f"Chat stream failed: {e!r}")
+            yield sse_event("error", {"error": "The assistant failed to respond"})
+            return
+        if session_id:
+            await asyncio.to_thread(append_turn, uid, session_id, 'bot', "".join(reply))
+        yield sse_event("done", {"sessionId": session_id})
+
+    headers = {"X-Chat-Session": session_id} if session_id else {}
+    if 'text/event-stream' in request.headers.get('Accept', ''):
+        headers.update({"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+        return StreamingResponse(generate_sse(), media_type='text/event-stream', headers=headers)
+    return StreamingResponse(generate(), media_type='text/plain', headers=headers)
+
+@require_auth
+async def get_lesson_content(request: Request):
+    uid = request.state.uid
+    params = request.path_params
+    try:
+        course_ref = async_db.collection("users").document(uid).collection("courses").document(params["course_id"])
+        lesson_ref = (
+            course_ref.collection("modules").document(params["module_id"])
+                      .collection("lessons").document(params["lesson_id"])
+        )
+        # all reads in flight at once
+        lesson_snap, content_snap, course_snap = await asyncio.gather(
+            lesson_ref.get(),
+            lesson_ref.collection("content").document("body").get(),
+            course_ref.get(),
+        )
+        if not lesson_snap.exists:
+            return json_response({"error": "Lesson not found"}, 404)
+
+        # lazy courses: opening a lesson queues its module and the next ones
+        course = course_snap.to_dict() or {}
+        try:
+            if unreleased_window(course, params["module_id"]):
+                # publishing is a blocking Redis call, keep it off the event loop
+                await asyncio.to_thread(
+                    release_upcoming_modules, uid, params["course_id"], course, params["module_id"]
+                )
+        except Exception as e:
+            flask_app.logger.warning(f"Could not release upcoming modules: {e!r}")
+
+        return json_response(with_content(lesson_snap.to_dict(), content_snap), 200)
+
+    except Exception as e:
+        return json_response({"error": str(e)}, 500)
+
+app = Starlette(
+    routes=[
+        Route("/api/chat", chat, methods=["POST"]),
+        Route(
+            "/api/retrieve/courses/{course_id}/modules/{module_id}/lessons/{lesson_id}",
+            get_lesson_content,
+            methods=["GET"],
+        ),
+    ],
+    middleware=[
+        Middleware(
+            CORSMiddleware,
+            allow_origins=["http://localhost:3000"],
+            allow_methods=["*"],
+            allow_headers=["*"],
+            expose_headers=["X-Chat-Session"],
+        ),
+    ],
+    lifespan=lifespan,
+)
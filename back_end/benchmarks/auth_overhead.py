@@ -0,0 +1,116 @@
+# back_end/benchmarks/auth_overhead.py
+"""
+Per-request auth overhead of a `require_auth` route: every request verifying the
+Firebase ID token (signature check against Google's certificates) versus the
+cached verify_token in back_end/utils/auth.py.
+
+Tokens are real RS256 JWTs signed with a throwaway key; the certificate endpoint
+is a local stub that, like Google's, lets the certificates be HTTP-cached, so the
+uncached numbers are the verification itself rather than a certificate fetch.
+
+    python -m back_end.benchmarks.auth_overhead --requests 2000
+"""
+
+import argparse
+import datetime
+import statistics
+import time
+import firebase_admin
+import google.auth.credentials
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from firebase_admin import _token_gen, credentials
+from flask import Flask, g, jsonify
+from google.auth import crypt, jwt
+from back_end.benchmarks.stub_http import serve_json
+from back_end.utils import auth
+
+PROJECT_ID = "auth-benchmark"
+KEY_ID = "benchmark-key"
+
+
+class _AnonymousCredential(credentials.Base):
+    # verify_id_token only needs the project id, never calls Google
+    def get_credential(self):
+        return google.auth.credentials.AnonymousCredentials()
+
+def signing_key() -> tuple[bytes, str]:
+    """
+    A fresh RSA key (PEM) and a self-signed certificate for it, like Google's x509 endpoint serves.
+    """
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "securetoken.system.gserviceaccount.com")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = x509.CertificateBuilder().subject_name(name).issuer_name(name) \
+        .public_key(key.public_key()).serial_number(x509.random_serial_number()) \
+        .not_valid_before(now - datetime.timedelta(days=1)).not_valid_after(now + datetime.timedelta(days=1)) \
+        .sign(key, hashes.SHA256())
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                            serialization.NoEncryption())
+    return pem, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+def id_token(private_pem: bytes, uid: str) -> str:
+    now = int(time.time())
+    signer = crypt.RSASigner.from_string(private_pem, key_id=KEY_ID)
+    return jwt.encode(signer, {
+        "iss": f"https://securetoken.google.com/{PROJECT_ID}",
+        "aud": PROJECT_ID,
+        "sub": uid,
+        "auth_time": now,
+        "iat": now,
+        "exp": now + 3600,
+    }).decode()
+
+def build_app() -> Flask:
+    app = Flask(__name__)
+
+    @app.route("/whoami")
+    @auth.require_auth
+    def whoami():
+        return jsonify(uid=g.uid)
+
+    return app
+
+def timed_requests(client, token: str, requests: int, cached: bool) -> list[float]:
+    headers = {"Authorization": f"Bearer {token}"}
+    timings = []
+    for _ in range(requests):
+        if not cached:
+            auth.token_cache.clear()
+        start = time.perf_counter()
+        response = client.get("/whoami", headers=headers)
+        timings.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.get_json()
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    private_pem, cert_pem = signing_key()
+    fetches = []
+    url, server = serve_json({"/certs": lambda method, path, body: fetches.append(path) or {KEY_ID: cert_pem}},
+                             headers={"Cache-Control": "public, max-age=3600"})
+    _token_gen.ID_TOKEN_CERT_URI = f"{url}/certs"
+    firebase_admin.initialize_app(_AnonymousCredential(), {"projectId": PROJECT_ID})
+
+    try:
+        client = build_app().test_client()
+        token = id_token(private_pem, "benchmark-user")
+        timed_requests(client, token, 20, cached=False)  # fetch and cache the certificates
+
+        uncached = timed_requests(client, token, args.requests, cached=False)
+        hits = auth.token_cache.hits
+        cached = timed_requests(client, token, args.requests, cached=True)
+        u, c = statistics.median(uncached) * 1000, statistics.median(cached) * 1000
+        print(f"verify every request: {u:.3f} ms/request ({len(fetches)} certificate fetches in all)")
+        print(f"cached verify_token:  {c:.3f} ms/request ({auth.token_cache.hits - hits} hits)")
+        print(f"saved per request:    {u - c:.3f} ms ({u / c:.1f}x)")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# back_end/benchmarks/chat_sessions.py
+"""
+Load benchmark: how many concurrent streaming chat sessions one back_end.asgi
+process holds. Opens `--sessions` SSE chats at once against the app in-process,
+with the chat model replaced by a stub that streams `--tokens` chunks
+`--interval` seconds apart, so the stream time is fixed and any excess wall time
+is the app's own overhead.
+
+    python -m back_end.benchmarks.chat_sessions --sessions 1000
+
+Imports the app like uvicorn does, so it needs the backend's usual .env and
+service account file; token verification is stubbed out (see auth_overhead) and
+the chats use the stateless `messages` protocol, so Firestore and Redis aren't hit.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+from langchain_core.messages import AIMessageChunk
+from back_end import asgi
+
+
+class StubChatModel:
+    """
+    Stands in for the streaming ChatOpenAI; counts the streams open at once.
+    """
+
+    def __init__(self, tokens: int, interval: float):
+        self.tokens = tokens
+        self.interval = interval
+        self.active = 0
+        self.peak = 0
+
+    async def astream(self, messages, **kwargs):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            for i in range(self.tokens):
+                await asyncio.sleep(self.interval)
+                yield AIMessageChunk(content=f"token{i} ")
+        finally:
+            self.active -= 1
+
+async def chat(client: httpx.AsyncClient, i: int) -> tuple[float, bool]:
+    start = time.perf_counter()
+    response = await client.post(
+        "/api/chat",
+        json={"messages": [{"from": "user", "text": f"Question {i}: what is a loop?"}]},
+        headers={"Authorization": "Bearer benchmark", "Accept": "text/event-stream"},
+    )
+    return time.perf_counter() - start, response.status_code == 200 and "event: done" in response.text
+
+async def run(sessions: int, tokens: int, interval: float):
+    model = StubChatModel(tokens, interval)
+    async with asgi.lifespan(asgi.app):
+        asgi.resources["chat_llm"] = model
+        transport = httpx.ASGITransport(app=asgi.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            await chat(client, 0)  # warm up
+            model.peak = 0
+            start = time.perf_counter()
+            results = await asyncio.gather(*(chat(client, i) for i in range(sessions)))
+            wall = time.perf_counter() - start
+
+    durations = sorted(d for d, _ in results)
+    completed = sum(1 for _, ok in results if ok)
+    stream = tokens * interval
+    print(f"{completed}/{sessions} sessions completed, {model.peak} streaming at once")
+    print(f"wall {wall:.2f}s for streams of {stream:.2f}s each; per session median "
+          f"{statistics.median(durations):.2f}s, p95 {durations[int(len(durations) * 0.95) - 1]:.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--tokens", type=int, default=40)
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between streamed chunks")
+    args = parser.parse_args()
+
+    asgi.verify_token = lambda token: {"uid": "benchmark-user"}
+    asyncio.run(run(args.sessions, args.tokens, args.interval))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# back_end/benchmarks/counter_contention.py
+"""
+Load test: many lesson tasks finishing at once, each bumping generatedLessons.
+Fires concurrent increments at one course document (the old Increment on the
+course) and at its counter shards (back_end.utils.counters), then rolls the
+shards up onto the course document and checks that no increment was lost.
+
+    gcloud emulators firestore start --host-port=localhost:8080
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python -m back_end.benchmarks.counter_contention
+
+The emulator doesn't enforce production's ~1 sustained write/s per document, so
+compare the latency and error counts here rather than the absolute throughput.
+"""
+
+import argparse
+import os
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from google.cloud import firestore
+from google.cloud.firestore import Increment
+from back_end.config import Config
+from back_end.utils.counters import increment_counter, read_counters
+
+
+def increment_document(course_ref, field: str):
+    course_ref.set({field: Increment(1)}, merge=True)
+
+def fire(increment, course_ref, writes: int, concurrency: int) -> tuple[float, list[float], int]:
+    """
+    `writes` increments from `concurrency` threads; returns wall time, per-write latencies and errors.
+    """
+    def one(_):
+        start = time.perf_counter()
+        try:
+            increment(course_ref, "generatedLessons")
+        except Exception:
+            return None
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, range(writes)))
+    latencies = [o for o in outcomes if o is not None]
+    return time.perf_counter() - start, latencies, len(outcomes) - len(latencies)
+
+def report(name: str, writes: int, wall: float, latencies: list[float], errors: int):
+    latencies = sorted(latencies) or [0.0]
+    print(f"{name:>10}: {writes} writes in {wall:.2f}s ({writes / wall:.0f}/s), "
+          f"median {statistics.median(latencies) * 1000:.1f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms, {errors} errors")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writes", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=60, help="lesson tasks finishing together")
+    args = parser.parse_args()
+
+    if not os.getenv("FIRESTORE_EMULATOR_HOST"):
+        parser.error("set FIRESTORE_EMULATOR_HOST to the Firestore emulator")
+    db = firestore.Client(project=os.getenv("GCLOUD_PROJECT", "benchmark"))
+    courses = db.collection("users").document("bench").collection("courses")
+
+    course_ref = courses.document(uuid.uuid4().hex)
+    report("document", args.writes, *fire(increment_document, course_ref, args.writes, args.concurrency))
+    print(f"{'':>10}  course total {course_ref.get().get('generatedLessons')}")
+
+    course_ref = courses.document(uuid.uuid4().hex)
+    course_ref.set({"generatedLessons": 0})
+    report("sharded", args.writes, *fire(increment_counter, course_ref, args.writes, args.concurrency))
+
+    # what rollup_course_counters does once per COUNTER_ROLLUP_SECONDS
+    start = time.perf_counter()
+    totals = read_counters(course_ref)
+    course_ref.update(totals)
+    print(f"{'':>10}  rollup of {Config.COUNTER_SHARDS} shards in {(time.perf_counter() - start) * 1000:.1f} ms, "
+          f"course total {course_ref.get().get('generatedLessons')}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# back_end/benchmarks/outline_writes.py
+"""
+Micro-benchmark: persisting a course outline with one set() per document versus
+one WriteBatch commit (what generate_outline does), against the Firestore emulator.
+
+    gcloud emulators firestore start --host-port=localhost:8080
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python -m back_end.benchmarks.outline_writes
+
+Only needs google-cloud-firestore; nothing here touches the real project.
+"""
+
+import argparse
+import os
+import statistics
+import time
+import uuid
+from google.cloud import firestore
+
+
+def outline(modules: int, lessons: int) -> list[dict]:
+    return [
+        {
+            "title": f"Module {mi}",
+            "lessons": [
+                {"title": f"Lesson {mi}.{li}", "type": "reading", "description": "A short description."}
+                for li in range(1, lessons + 1)
+            ],
+        }
+        for mi in range(1, modules + 1)
+    ]
+
+def lesson_doc(lesson: dict) -> dict:
+    return {**lesson, "completed": False, "status": "pending"}
+
+def write_per_document(db, course_ref, modules: list[dict]):
+    # the original course() loop: one round trip per module and per lesson
+    course_ref.set({"status": "generating", "totalLessons": sum(len(m["lessons"]) for m in modules)}, merge=True)
+    for mi, mod in enumerate(modules, start=1):
+        module_ref = course_ref.collection("modules").document(str(mi))
+        module_ref.set({"title": mod["title"]})
+        for li, lesson in enumerate(mod["lessons"], start=1):
+            module_ref.collection("lessons").document(str(li)).set(lesson_doc(lesson))
+
+def write_batched(db, course_ref, modules: list[dict]):
+    # the whole tree in one commit (8x8 lessons stays well under the 500 writes limit)
+    batch = db.batch()
+    batch.set(course_ref, {"status": "generating", "totalLessons": sum(len(m["lessons"]) for m in modules)}, merge=True)
+    for mi, mod in enumerate(modules, start=1):
+        module_ref = course_ref.collection("modules").document(str(mi))
+        batch.set(module_ref, {"title": mod["title"]})
+        for li, lesson in enumerate(mod["lessons"], start=1):
+            batch.set(module_ref.collection("lessons").document(str(li)), lesson_doc(lesson))
+    batch.commit()
+
+def run(db, write, modules: list[dict], rounds: int) -> list[float]:
+    timings = []
+    for _ in range(rounds):
+        course_ref = db.collection("users").document("bench").collection("courses").document(uuid.uuid4().hex)
+        start = time.perf_counter()
+        write(db, course_ref, modules)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", type=int, default=8)
+    parser.add_argument("--lessons", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    if not os.getenv("FIRESTORE_EMULATOR_HOST"):
+        parser.error("set FIRESTORE_EMULATOR_HOST to the Firestore emulator")
+    db = firestore.Client(project=os.getenv("GCLOUD_PROJECT", "benchmark"))
+    modules = outline(args.modules, args.lessons)
+    writes = 1 + args.modules * (1 + args.lessons)
+
+    run(db, write_batched, modules, 2)  # warm up the channel
+    for name, write in (("per document", write_per_document), ("batched", write_batched)):
+        timings = run(db, write, modules, args.rounds)
+        print(f"{name:>12}: {writes} writes, median {statistics.median(timings) * 1000:.1f} ms, "
+              f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1] * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# back_end/benchmarks/stub_http.py
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def serve_json(routes: dict, headers: dict = None) -> tuple[str, ThreadingHTTPServer]:
+    """
+    Serve canned JSON on 127.0.0.1 from a background thread, standing in for a remote API.
+    `routes` maps a path prefix to a function (method, path, body) -> payload; `headers`
+    are added to every response.
+    Returns the base url ("http://127.0.0.1:<port>") and the server, to shutdown() when done.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+        # headers and body in one write, sent at once: no Nagle/delayed-ACK stalls in the timings
+        wbufsize = 65536
+        disable_nagle_algorithm = True
+
+        def _reply(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            for prefix, handler in routes.items():
+                if self.path.startswith(prefix):
+                    status, payload = 200, handler(self.command, self.path, body)
+                    break
+            else:
+                status, payload = 404, {"error": f"no stub for {self.path}"}
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = do_POST = _reply
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
@@ -0,0 +1,110 @@
+# back_end/benchmarks/task_overhead.py
+"""
+Per-task overhead of the lesson and outline tasks, before and after the worker
+resource registry (back_end/tasks/resources.py), against a local stub of the
+OpenRouter chat completions API, so only our own setup cost is measured.
+
+  reading task   before: a TavilySearchResults, a closure tool and a freshly compiled
+                 react agent per task.  after: one agent compiled per process, with
+                 per-request state passed through the run config.
+  outline call   before: a new ChatOpenAI per request, i.e. a new HTTP client (its SSL
+                 context) and connection.
+                 after: one pooled keep-alive client per process.
+
+    python -m back_end.benchmarks.task_overhead --tasks 200
+"""
+
+import argparse
+import os
+import statistics
+import time
+import httpx
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import tool
+from langchain_openai import ChatOpenAI
+from langgraph.prebuilt import create_react_agent
+from back_end.benchmarks.stub_http import serve_json
+
+MESSAGES = [
+    {"role": "system", "content": "You are a detailed lesson writer."},
+    {"role": "user", "content": "Write a short passage on Python loops."},
+]
+
+
+def completion(method, path, body) -> dict:
+    return {
+        "id": "stub", "object": "chat.completion", "created": 0, "model": "stub",
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": "A passage on loops."}}],
+        "usage": {"prompt_tokens": 20, "completion_tokens": 5, "total_tokens": 25},
+    }
+
+def chat_model(base_url: str, http_client: httpx.Client = None) -> ChatOpenAI:
+    return ChatOpenAI(model="stub", api_key="benchmark", base_url=base_url,
+                      http_client=http_client or httpx.Client())
+
+def reading_before(llm):
+    from langchain_community.tools.tavily_search import TavilySearchResults
+
+    citations = []
+    search_tool = TavilySearchResults(max_results=10, search_depth="advanced")
+
+    @tool
+    def retrieve_context(query: str) -> str:
+        """Use this to retrieve relevant context on the web for test generation."""
+        results = search_tool.invoke(query)
+        citations.extend({"title": r["title"], "url": r["url"]} for r in results)
+        return "\n\n".join(r.get("content", "") for r in results)
+
+    agent = create_react_agent(model=llm, tools=[retrieve_context])
+    agent.invoke({"messages": MESSAGES})
+
+@tool
+def retrieve_context(query: str, config: RunnableConfig) -> str:
+    """Use this to retrieve relevant context on the web for test generation."""
+    config["configurable"]["citations"].append({"title": query, "url": ""})
+    return ""
+
+def reading_after(agent):
+    agent.invoke({"messages": MESSAGES}, config={"configurable": {"citations": []}})
+
+def timed(fn, runs: int) -> list[float]:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def report(name: str, before: list[float], after: list[float]):
+    b, a = statistics.median(before) * 1000, statistics.median(after) * 1000
+    print(f"{name:>14}: before {b:.2f} ms/task, after {a:.2f} ms/task, saved {b - a:.2f} ms ({b / a:.1f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.setdefault("TAVILY_API_KEY", "benchmark")  # the tool is built, never called
+    url, server = serve_json({"/v1/chat/completions": completion})
+    base_url = f"{url}/v1"
+    try:
+        # what a worker process holds after init_worker_resources
+        pooled_http = httpx.Client(limits=httpx.Limits(max_keepalive_connections=10))
+        shared_llm = chat_model(base_url, pooled_http)
+        agent = create_react_agent(model=shared_llm, tools=[retrieve_context])
+        for _ in range(5):  # warm up imports and the pooled connection
+            reading_before(shared_llm)
+            reading_after(agent)
+
+        report("reading task",
+               timed(lambda: reading_before(shared_llm), args.tasks),
+               timed(lambda: reading_after(agent), args.tasks))
+        report("outline call",
+               timed(lambda: chat_model(base_url).invoke(MESSAGES), args.tasks),
+               timed(lambda: shared_llm.invoke(MESSAGES), args.tasks))
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# back_end/benchmarks/youtube_client.py
+"""
+Per-call overhead of the YouTube Data API client: the per-process client built
+from the bundled discovery document (back_end/tasks/youtube.py) versus
+googleapiclient's build() on every call, as search_youtube_videos and
+fetch_video_stats used to do. Both talk to a local stub of the API, so the
+difference is client construction and connection setup.
+
+    python -m back_end.benchmarks.youtube_client --calls 500
+"""
+
+import argparse
+import statistics
+import threading
+import time
+from googleapiclient.discovery import build
+from back_end.benchmarks.stub_http import serve_json
+from back_end.tasks import youtube
+
+API_KEY = "benchmark"
+API_ROOT = "https://youtube.googleapis.com/"
+
+
+def api(method, path, body) -> dict:
+    if "/videos" in path:
+        return {"items": [{"id": "v1", "statistics": {"viewCount": "1000", "likeCount": "50"}}]}
+    return {"items": [{"id": {"videoId": "v1"}, "snippet": {"title": "Python loops"}}]}
+
+def reused(root: str):
+    return youtube.get_youtube(API_KEY).videos().list(part="statistics", id="v1").execute(http=youtube._http())
+
+def build_per_call(root: str):
+    service = build("youtube", "v3", developerKey=API_KEY, cache_discovery=False)
+    service._baseUrl = root  # the full document's rootUrl, servicePath is ""
+    return service.videos().list(part="statistics", id="v1").execute()
+
+def timed(call, root: str, calls: int, threads: int) -> list[float]:
+    timings = []
+
+    def work():
+        for _ in range(calls // threads):
+            start = time.perf_counter()
+            call(root)
+            timings.append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=1, help="concurrent callers, like a threaded worker")
+    args = parser.parse_args()
+
+    url, server = serve_json({"/youtube/v3/": api})  # unknown paths 404, so the calls fail loudly
+    root = f"{url}/"
+    youtube._DISCOVERY_DOCUMENT = youtube._DISCOVERY_DOCUMENT.replace(API_ROOT, root)
+    youtube.reset_youtube_clients()
+    try:
+        for call in (reused, build_per_call):  # warm up imports and connections
+            timed(call, root, 5, 1)
+        after = timed(reused, root, args.calls, args.threads)
+        before = timed(build_per_call, root, args.calls, args.threads)
+        b, a = statistics.median(before) * 1000, statistics.median(after) * 1000
+        print(f"build per call: {b:.2f} ms/call")
+        print(f"reused client:  {a:.2f} ms/call")
+        print(f"saved per call: {b - a:.2f} ms ({b / a:.1f}x)")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -11,9 +11,48 @@ def make_celery_app():
     celery = Celery(
         flask_app.import_name,
         broker=flask_app.config['REDIS_URL'],
-        backend=flask_app.config['REDIS_URL']
+        backend=flask_app.config['REDIS_URL'],
+        include=[
+            'back_end.tasks.worker',
+            'back_end.tasks.counters',
+            'back_end.tasks.maintenance',
+            'back_end.tasks.indexing',
+            'back_end.tasks.chat',
+        ]
     )
     celery.conf.update(flask_app.config)
+
+    # LLM-heavy tasks and light I/O/bookkeeping tasks get their own queues (and workers),
+    # so a video lookup or a progress roll-up never waits behind a reading agent.
+    # Within a queue the Redis broker serves priority 0 first: outlines, then each course's
+    # first lesson, then lessons module by module (see worker._lesson_priority).
+    celery.conf.task_routes = {
+        'generate_outline': {'queue': 'llm'},
+        'generate_reading_content': {'queue': 'llm'},
+        'generate_test_content': {'queue': 'llm'},
+        'generate_assignment_content': {'queue': 'llm'},
+        'summarize_chat_session': {'queue': 'llm'},
+    }
+    celery.conf.task_default_queue = 'io'
+    celery.conf.task_default_priority = 5
+    celery.conf.broker_transport_options = {
+        'priority_steps': list(range(10)),
+        'sep': ':',
+        'queue_order_strategy': 'priority',
+    }
+    # reserve one task at a time, otherwise prefetched low-priority tasks jump the queue
+    celery.conf.worker_prefetch_multiplier = 1
+    # keep each task's kwargs with its result, so a join over task ids (await_course_lessons)
+    # can tell which lessons a failed task was generating
+    celery.conf.result_extended = True
+
+    # periodic jobs, run with `celery -A back_end.tasks.worker beat`
+    celery.conf.beat_schedule = {
+        'purge-deleted-courses': {
+            'task': 'purge_deleted_courses',
+            'schedule': flask_app.config['PURGE_INTERVAL_SECONDS'],
+        },
+    }
     TaskBase = celery.Task
 
     class ContextTask(TaskBase):
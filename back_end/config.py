@@ -1,38 +1,93 @@
+import json
 import os
 from dotenv import load_dotenv
 load_dotenv()
 
-from langchain_openai import ChatOpenAI
-
 class Config:
     BASE_DIR = os.path.abspath(os.path.dirname(__file__))
     OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
     EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence-transformers")
+    RAG_CHUNK_WORDS = 120
+    RAG_TOP_K = 4
     MODEL = os.getenv("BASE_MODEL")
-    TEST_MODEL = ChatOpenAI(
-        model=os.getenv("BASE_MODEL"),
-        api_key=os.getenv("OPENROUTER_API_KEY"),
-        base_url="https://openrouter.ai/api/v1",
-    )
-    LESSON_READING_MODEL = ChatOpenAI(
-        model=os.getenv("LESSON_READING_MODEL"),
-        api_key=os.getenv("OPENROUTER_API_KEY"),
-        base_url="https://openrouter.ai/api/v1",
-    )
-    CHAT_MODEL = ChatOpenAI(
-        model=os.getenv("CHAT_MODEL"),
-        streaming=True,
-        stream_usage=True,
-        api_key=os.getenv("OPENROUTER_API_KEY"),
-        base_url="https://openrouter.ai/api/v1",
-    )
+    LESSON_READING_MODEL_NAME = os.getenv("LESSON_READING_MODEL")
+    CHAT_MODEL_NAME = os.getenv("CHAT_MODEL")
     TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
     REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
     YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
+    YOUTUBE_DAILY_QUOTA = int(os.getenv("YOUTUBE_DAILY_QUOTA", 10000))
+    YOUTUBE_SEARCH_TTL = 60 * 60 * 24 * 7
+    YOUTUBE_STATS_TTL = 60 * 60 * 24
+    HTTP_TIMEOUT = 60
+    AUTH_CACHE_SIZE = 10000
+    AUTH_CACHE_TTL = 5 * 60
+    LESSON_CONTEXT_CACHE_SIZE = 2000
+    LESSON_CONTEXT_TTL = 10 * 60
+    LESSON_CONTEXT_REDIS_TTL = 60 * 60
+    CHAT_SESSION_TTL = 60 * 60 * 24
+    CHAT_WINDOW_TOKENS = 2000
+    CHAT_SUMMARY_MAX_TOKENS = 400
+    CHAT_SUMMARY_LOCK_SECONDS = 120
+    CHAT_SSE_COALESCE_MS = 50
+    CHAT_SSE_COALESCE_CHARS = 256
+    CHAT_SSE_HEARTBEAT_SECONDS = 15
+    HTTP_MAX_CONNECTIONS = 20
+    # OpenRouter limits shared by every process through Redis, per model;
+    # LLM_RATE_LIMITS overrides them as JSON: {"model": {"rpm": 60, "tpm": 100000}}
+    LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", 500))
+    LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", 1000000))
+    LLM_RATE_LIMITS = json.loads(os.getenv("LLM_RATE_LIMITS", "{}"))
+    LLM_RATE_HEADROOM = 0.9
+    LLM_DEFAULT_COMPLETION_TOKENS = 1500
+    LLM_MIN_CONCURRENCY = 1
+    LLM_MAX_CONCURRENCY = 64
+    LLM_AIMD_DECREASE = 0.5
+    LLM_LEASE_SECONDS = 10 * 60
+    LLM_RATE_LIMIT_TIMEOUT = 5 * 60
+    ASYNC_HTTP_MAX_CONNECTIONS = 1000
     NUM_QUESTIONS = 5
     MIN_WORDS = 600
+    # reading lessons are written to their content doc while being generated ("partial": true),
+    # at most once per READING_FLUSH_SECONDS (Firestore sustains about 1 write/s per document)
+    READING_STREAMING = os.getenv("READING_STREAMING", "true").lower() == "true"
+    READING_FLUSH_SECONDS = 1.5
+    READING_FLUSH_MIN_CHARS = 200
     MIN_LESSONS = 3
     MAX_LESSONS = 8
+    OUTLINE_STREAMING = os.getenv("OUTLINE_STREAMING", "true").lower() == "true"
+    # lazy courses generate their first LAZY_EAGER_MODULES modules up front and the rest
+    # once the learner opens or completes a lesson LAZY_LOOKAHEAD_MODULES modules before them
+    LAZY_GENERATION = os.getenv("LAZY_GENERATION", "false").lower() == "true"
+    LAZY_EAGER_MODULES = 1
+    LAZY_LOOKAHEAD_MODULES = 1
+    AWAIT_LESSONS_INTERVAL = 5
+    COUNTER_SHARDS = 10
+    COUNTER_ROLLUP_SECONDS = 5
+    DELETE_MAX_OPS_PER_SECOND = 500
+    COURSE_TASKS_TTL = 60 * 60 * 24
+    LESSON_MAX_RETRIES = 3
+    LESSON_RETRY_BACKOFF = 5
+    LESSON_RETRY_BACKOFF_MAX = 120
+    GENERATION_CACHE_TTL = 60 * 60 * 24 * 30
+    GENERATION_CACHE_MAX_ENTRIES = 50000
+    TAVILY_CACHE_TTL = 60 * 60 * 24 * 7
+    MODULE_RESEARCH = os.getenv("MODULE_RESEARCH", "true").lower() == "true"
+    MODULE_RESEARCH_MAX_RESULTS = 15
+    MODULE_RESEARCH_RESULTS_PER_QUERY = 6
+    MODULE_RESEARCH_CONCURRENCY = 4
+    MODULE_RESEARCH_TTL = 60 * 60 * 24
+    SEARCH_CONTEXT_TOKENS = 1500
+    SEARCH_PASSAGE_WORDS = 60
+    SEARCH_MIN_PASSAGE_WORDS = 8
+    SEARCH_DEDUP_THRESHOLD = 0.8
+    SEARCH_MIN_RELATIVE_SCORE = 0.3
+    SEARCH_MINHASH_PERMUTATIONS = 64
+    PURGE_GRACE_DAYS = int(os.getenv("PURGE_GRACE_DAYS", 30))
+    PURGE_INTERVAL_SECONDS = 60 * 60
+    PURGE_BATCH_SIZE = 20
+    PURGE_MAX_OPS_PER_SECOND = 50
+    PURGE_PAUSE_SECONDS = 1
 
 
 
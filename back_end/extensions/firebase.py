@@ -1,5 +1,5 @@
 import firebase_admin
-from firebase_admin import credentials, firestore
+from firebase_admin import credentials, firestore, firestore_async
 import os
 
 base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -10,3 +10,5 @@ if not firebase_admin._apps:
     firebase_admin.initialize_app(cred)
 
 db = firestore.client()
+# used by the async app (back_end/asgi.py); connects lazily on first use
+async_db = firestore_async.client()
@@ -0,0 +1,7 @@
+import redis
+import redis.asyncio
+from back_end.config import Config
+
+redis_client = redis.Redis.from_url(Config.REDIS_URL)
+# for the async app (back_end/asgi.py)
+async_redis_client = redis.asyncio.Redis.from_url(Config.REDIS_URL)
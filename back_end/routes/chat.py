@@ -1,68 +1,84 @@
-from flask import Blueprint, request, Response, stream_with_context, current_app, jsonify
-import firebase_admin
-from firebase_admin import auth as firebase_auth, firestore
+from flask import Blueprint, request, Response, stream_with_context, current_app, jsonify, g
+from back_end.utils.auth import require_auth
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-import time
-from back_end.extensions.firebase import db
+import uuid
+from back_end.utils.lesson_context import get_lesson_context
+from back_end.utils.embeddings import get_embedder, decode_matrix, top_k
+from back_end.utils.chat_sessions import SESSION_ID_RE, load_session, append_turn, window_turns, clear_session
+from back_end.tasks.chat import schedule_summary
+from back_end.tasks.resources import get_client
+from back_end.config import Config
+from back_end.utils.sse import BackgroundStream, coalesced_events, sse_event
 
 chat_bp = Blueprint('chat_bp', __name__)
 
-# Initialize Firestore client once
+def _relevant_content(lesson_context: dict, question: str):
+    """
+    Only the lesson chunks closest to the latest question, in reading order.
+    Returns None when the whole lesson is small enough or the index was built by another embedder.
+    """
+    top_k_chunks = Config.RAG_TOP_K
+    embedder = get_embedder()
+    if len(lesson_context['chunks']) <= top_k_chunks or lesson_context['embedder'] != embedder.name:
+        return None
 
-@chat_bp.route("/api/chat", methods=['POST'])
-def chat():
-    # 1) Verify Firebase ID token
-    auth_header = request.headers.get('Authorization', '')
-    if not auth_header.startswith('Bearer '):
-        return jsonify({"error": "Missing or malformed Authorization header"}), 401
+    matrix = decode_matrix(lesson_context['embeddings'], lesson_context['dim'])
+    best = top_k(embedder.embed([question])[0], matrix, top_k_chunks)
+    return "\n\n[...]\n\n".join(lesson_context['chunks'][i] for i in sorted(best))
 
-    id_token = auth_header.split('Bearer ')[1]
-    try:
-        decoded_token = firebase_auth.verify_id_token(id_token)
-        uid = decoded_token['uid']
-    except Exception as e:
-        current_app.logger.error(f"Token verify failed: {e}")
-        return jsonify({"error": "Invalid auth token", "details": str(e)}), 401
-    
-    # 2) Extract message history and reference
-    payload = request.get_json(silent=True) or {}
-    raw_msgs = payload.get('messages', [])
-    reference = payload.get('reference', {})
-    if not isinstance(raw_msgs, list):
-        return jsonify({"error": "'messages' must be a list"}), 400
+def lesson_reference(payload: dict):
+    """
+    (course_id, module_id, lesson_id) from the request's 'reference', or None if incomplete.
+    """
+    reference = payload.get('reference') or {}
+    ids = (reference.get('courseId'), reference.get('moduleId'), reference.get('lessonId'))
+    return ids if all(ids) else None
 
-    # 3) Fetch context from Firestore
-    context_parts = []
-    course_id = reference.get('courseId')
-    module_id = reference.get('moduleId')
-    lesson_id = reference.get('lessonId')
-    print(reference)
+def prepare_history(uid: str, payload: dict):
+    """
+    The turns to send to the model, the session id and the rolling summary.
+    Raises ValueError for a malformed payload.
 
-    try:
-        course_ref = db.collection('users').document(uid) \
-                        .collection('courses').document(course_id)
-        course_doc = course_ref.get()
-        context_parts.append(f"Course Topic: {course_doc.get('topic')}")
-        
-        module_ref = course_ref.collection('modules').document(module_id)
-        module_doc = module_ref.get()
-        context_parts.append(f"Module Title: {module_doc.get('title')}")
-
-        lesson_ref = module_ref.collection('lessons').document(lesson_id)
-        lesson_doc = lesson_ref.get()
+    Session protocol: {sessionId?, message} -- history lives in Redis.
+    Legacy protocol:  {messages: [...]}     -- client resends the whole history.
+    """
+    message = payload.get('message')
+    if message is None:
+        raw_msgs = payload.get('messages', [])
+        if not isinstance(raw_msgs, list):
+            raise ValueError("'messages' must be a list")
+        return raw_msgs, None, ''
+
+    if not isinstance(message, str) or not message.strip():
+        raise ValueError("'message' must be a non-empty string")
+    session_id = payload.get('sessionId') or uuid.uuid4().hex
+    if not isinstance(session_id, str) or not SESSION_ID_RE.match(session_id):
+        raise ValueError("Invalid 'sessionId'")
+
+    summary, turns = load_session(uid, session_id)
+    append_turn(uid, session_id, 'user', message)
+    raw_msgs, older = window_turns(turns + [{"from": "user", "text": message}])
+    schedule_summary(uid, session_id, older)
+    return raw_msgs, session_id, summary
+
+def build_chat_messages(raw_msgs: list, summary: str, lesson_context) -> list:
+    """
+    System prompt with the lesson context (and the rolling summary), followed by the history.
+    """
+    context_parts = []
+    if lesson_context:
+        context_parts.append(f"Course Topic: {lesson_context['topic']}")
+        context_parts.append(f"Module Title: {lesson_context['moduleTitle']}")
         context_parts.append(
-            f"""Lesson Title: {lesson_doc.get('title')}\n
-                Type: {lesson_doc.get('type')}\n
-                Description: {'None'}\n
-                """
+            f"""Lesson Title: {lesson_context['lessonTitle']}\n
+            Type: {lesson_context['type']}\n
+            Description: {'None'}\n
+            """
         )
-
-        content_ref = lesson_ref.collection('content').document('body')
-        content_doc = content_ref.get()
-        context_parts.append(f'Content:\n{content_doc.get('content') if lesson_doc.get('type') != "video" else 'video content'}')
-    except Exception as e:
-        # Log or handle Firestore errors
-        current_app.logger.error(f"Error fetching reference data: {e}")
+        content = lesson_context['content'] if lesson_context['type'] != "video" else 'video content'
+        if lesson_context.get('chunks') and raw_msgs:
+            content = _relevant_content(lesson_context, raw_msgs[-1].get('text', '')) or content
+        context_parts.append(f"Content:\n{content}")
 
     # Combine into single prompt context (truncate or chunk if needed)
     full_context = "\n\n---\n\n".join(context_parts)
@@ -77,6 +93,8 @@ def chat():
     """
 
     prompt = template.format(context=full_context)
+    if summary:
+        prompt += f"\n    Summary of the earlier conversation:\n    {summary}\n"
     chain_msgs = [SystemMessage(content=prompt)]
 
     # Convert user/AI history
@@ -85,12 +103,85 @@ def chat():
             chain_msgs.append(HumanMessage(content=m.get('text', '')))
         else:
             chain_msgs.append(AIMessage(content=m.get('text', '')))
+    return chain_msgs
+
+@chat_bp.route("/api/chat", methods=['POST'])
+@require_auth
+def chat():
+    # 1) Caller verified by require_auth
+    uid = g.uid
+
+    # 2) Extract message history and reference
+    payload = request.get_json(silent=True) or {}
+    try:
+        raw_msgs, session_id, summary = prepare_history(uid, payload)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # 3) Fetch context (cached; Firestore only on a miss)
+    lesson_context = None
+    ids = lesson_reference(payload)
+    try:
+        if ids:
+            lesson_context = get_lesson_context(uid, *ids)
+    except Exception as e:
+        # Log or handle Firestore errors
+        current_app.logger.error(f"Error fetching reference data: {e}")
+
+    chain_msgs = build_chat_messages(raw_msgs, summary, lesson_context)
+
+    # 4) Stream LLM response.
+    #    A client disconnect closes these generators at their next yield, which
+    #    closes (or cancels) the upstream LLM stream instead of letting it run on.
+    llm = get_client("chat_llm")
+    reply = []
 
-    # 4) Stream LLM response
-    llm = current_app.config['CHAT_MODEL']
     def generate():
-        for chunk in llm.stream(chain_msgs, user=uid):
-            yield chunk.content.encode('utf-8')
-            time.sleep(0.01)
+        chunks = llm.stream(chain_msgs, user=uid)
+        try:
+            for chunk in chunks:
+                reply.append(chunk.content)
+                yield chunk.content.encode('utf-8')
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+        if session_id:
+            append_turn(uid, session_id, 'bot', "".join(reply))
+
+    def generate_sse():
+        stream = BackgroundStream(llm.stream(chain_msgs, user=uid))
+        try:
+            yield from coalesced_events(
+                stream,
+                window=current_app.config['CHAT_SSE_COALESCE_MS'] / 1000,
+                max_chars=current_app.config['CHAT_SSE_COALESCE_CHARS'],
+                heartbeat=current_app.config['CHAT_SSE_HEARTBEAT_SECONDS'],
+                on_text=reply.append,
+            )
+        except Exception as e:
+            current_app.logger.error(f"Chat stream failed: {e!r}")
+            yield sse_event("error", {"error": "The assistant failed to respond"})
+            return
+        finally:
+            stream.cancel()
+        if session_id:
+            append_turn(uid, session_id, 'bot', "".join(reply))
+        yield sse_event("done", {"sessionId": session_id})
+
+    if 'text/event-stream' in request.headers.get('Accept', ''):
+        response = Response(stream_with_context(generate_sse()), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+    else:
+        response = Response(stream_with_context(generate()), mimetype='text/plain')
+    if session_id:
+        response.headers['X-Chat-Session'] = session_id
+    return response
 
-    return Response(stream_with_context(generate()), mimetype='text/plain')
+@chat_bp.route("/api/chat/sessions/<session_id>", methods=['DELETE'])
+@require_auth
+def delete_session(session_id):
+    if not SESSION_ID_RE.match(session_id):
+        return jsonify({"error": "Invalid 'sessionId'"}), 400
+    clear_session(g.uid, session_id)
+    return jsonify({"id": session_id, "deleted": True}), 200
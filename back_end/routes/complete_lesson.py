@@ -1,6 +1,9 @@
-from flask import Blueprint, request, jsonify, current_app
-from firebase_admin import auth as firebase_auth, firestore
+from flask import Blueprint, jsonify, current_app, g
+from firebase_admin import firestore
+from back_end.utils.auth import require_auth
 from back_end.extensions.firebase import db
+from back_end.tasks.counters import record_progress
+from back_end.tasks.worker import release_upcoming_modules
 
 complete_bp = Blueprint('complete_bp', __name__)
 
@@ -8,19 +11,10 @@ complete_bp = Blueprint('complete_bp', __name__)
     '/api/courses/<course_id>/modules/<module_id>/lessons/<lesson_id>/complete',
     methods=['POST']
 )
+@require_auth
 def complete_lesson(course_id, module_id, lesson_id):
-    # 1) Verify and decode the Firebase ID token
-    auth_header = request.headers.get('Authorization', '')
-    if not auth_header.startswith('Bearer '):
-        return jsonify({ 'message': 'Missing Authorization header' }), 401
-
-    id_token = auth_header.split('Bearer ')[1]
-    try:
-        decoded = firebase_auth.verify_id_token(id_token)
-        uid = decoded['uid']
-    except Exception as e:
-        current_app.logger.error(f'Invalid token: {e!r}')
-        return jsonify({ 'message': 'Invalid auth token' }), 401
+    # 1) Caller verified by require_auth
+    uid = g.uid
 
     # 2) References to the lesson and course docs
     lesson_ref = (
@@ -36,10 +30,21 @@ def complete_lesson(course_id, module_id, lesson_id):
         lesson_ref.update({ 'completed': True })
 
         # 4) Increment the counter of completedLessons
-        course_ref.update({ 'completedLessons': firestore.Increment(1) })
+        #    (sharded for courses that carry shards, directly on older ones)
+        course = course_ref.get().to_dict() or {}
+        if course.get('counterShards'):
+            record_progress(uid, course_id, 'completedLessons')
+        else:
+            course_ref.update({ 'completedLessons': firestore.Increment(1) })
 
     except Exception as e:
         current_app.logger.error(f'Firestore update failed: {e!r}')
         return jsonify({ 'message': 'Could not update lesson status' }), 500
 
+    # 5) Lazy courses: get the next module ready while this one is being studied
+    try:
+        release_upcoming_modules(uid, course_id, course, module_id)
+    except Exception as e:
+        current_app.logger.warning(f'Could not release upcoming modules: {e!r}')
+
     return jsonify({ 'message': 'Lesson marked complete' }), 200
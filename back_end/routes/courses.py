@@ -1,27 +1,18 @@
-from flask import Blueprint, request, jsonify, current_app
-from firebase_admin import auth as firebase_auth, firestore
+from flask import Blueprint, request, jsonify, current_app, g
+from firebase_admin import firestore
+from back_end.utils.auth import require_auth
 from back_end.extensions.firebase import db
+from back_end.utils.lesson_context import invalidate_lesson_context
+from back_end.utils.task_registry import cancel_course, clear_cancelled, register_tasks
+from back_end.tasks.worker import regenerate_failed_lessons
+from datetime import datetime, timezone
 
 courses_bp = Blueprint('courses_bp', __name__)
 
-def verify_token():
-    auth_header = request.headers.get('Authorization', '')
-    if not auth_header.startswith('Bearer '):
-        return None, (jsonify(error='Missing Authorization header'), 401)
-    id_token = auth_header.split()[1]
-    try:
-        decoded = firebase_auth.verify_id_token(id_token)
-        return decoded['uid'], None
-    except Exception as e:
-        current_app.logger.warning(f'Token verification failed: {e!r}')
-        return None, (jsonify(error='Invalid auth token'), 401)
-
-
 @courses_bp.route('/api/courses/<course_id>/delete', methods=['POST'])
+@require_auth
 def delete_course(course_id):
-    uid, err = verify_token()
-    if err:
-        return err
+    uid = g.uid
 
     course_ref = (
         db.collection('users').document(uid)
@@ -29,8 +20,14 @@ def delete_course(course_id):
     )
 
     try:
-        # 3) Soft-delete the course
-        course_ref.update({ 'deleted': True })
+        # 2) Stop any generation still running for it
+        cancel_course(uid, course_id)
+
+        # 3) Soft-delete the course; the purge worker hard-deletes it after the grace period
+        course_ref.update({
+            'deleted': True,
+            'deletedAt': datetime.now(timezone.utc).isoformat(),
+        })
     except Exception as e:
         current_app.logger.error(f'Failed to delete course: {e!r}')
         return jsonify(error='Could not delete course'), 500
@@ -38,15 +35,69 @@ def delete_course(course_id):
     return jsonify(message='Course marked as deleted'), 200
 
 
+@courses_bp.route('/api/courses/<course_id>/cancel', methods=['POST'])
+@require_auth
+def cancel_generation(course_id):
+    uid = g.uid
+
+    course_ref = (
+        db.collection('users').document(uid)
+          .collection('courses').document(course_id)
+    )
+
+    try:
+        course_snap = course_ref.get()
+        if not course_snap.exists:
+            return jsonify(error='Course not found'), 404
+        # the cancel flag would also stop a ready lazy course from releasing its later modules
+        if course_snap.get('status') not in ('outlining', 'generating'):
+            return jsonify(error='Course is not generating'), 409
+        revoked = cancel_course(uid, course_id)
+        course_ref.update({'status': 'cancelled'})
+    except Exception as e:
+        current_app.logger.error(f'Failed to cancel generation: {e!r}')
+        return jsonify(error='Could not cancel generation'), 500
+
+    return jsonify(message='Generation cancelled', revoked=revoked), 200
+
+
+@courses_bp.route('/api/courses/<course_id>/regenerate-failed', methods=['POST'])
+@require_auth
+def regenerate_failed(course_id):
+    uid = g.uid
+
+    course_ref = (
+        db.collection('users').document(uid)
+          .collection('courses').document(course_id)
+    )
+
+    try:
+        if not course_ref.get().exists:
+            return jsonify(error='Course not found'), 404
+        task = regenerate_failed_lessons.signature(kwargs={'uid': uid, 'course_id': course_id})
+        register_tasks(uid, course_id, [task.freeze().id])
+        task.apply_async()
+    except Exception as e:
+        current_app.logger.error(f'Failed to regenerate lessons: {e!r}')
+        return jsonify(error='Could not regenerate lessons'), 500
+
+    return jsonify(message='Regenerating failed lessons'), 202
+
+
 @courses_bp.route('/api/courses/<course_id>/restore', methods=['POST'])
+@require_auth
 def restore_course(course_id):
-    uid, err = verify_token()
-    if err:
-        return err
+    uid = g.uid
 
     course_ref = db.collection('users').document(uid).collection('courses').document(course_id)
     try:
-        course_ref.update({'deleted': False})
+        course = course_ref.get().to_dict() or {}
+        update = {'deleted': False, 'deletedAt': firestore.DELETE_FIELD}
+        # deleting cancelled any generation in progress; its lessons can be regenerated now
+        if course.get('status') in ('outlining', 'generating'):
+            update['status'] = 'cancelled'
+        course_ref.update(update)
+        clear_cancelled(uid, course_id)
     except Exception as e:
         current_app.logger.error(f'Failed to restore course: {e!r}')
         return jsonify(error='Could not restore course'), 500
@@ -55,11 +106,10 @@ def restore_course(course_id):
 
 
 @courses_bp.route('/api/courses/<course_id>/update-title', methods=['POST'])
+@require_auth
 def update_course_title(course_id):
-    # 1) Verify Firebase ID token
-    uid, err = verify_token()
-    if err:
-        return err
+    # 1) Caller verified by require_auth
+    uid = g.uid
 
     # 2) Read new title from request body
     payload = request.get_json(silent=True) or {}
@@ -76,6 +126,7 @@ def update_course_title(course_id):
     # 4) Perform the update
     try:
         course_ref.update({'title': new_title})
+        invalidate_lesson_context(uid, course_id)
     except Exception as e:
         current_app.logger.error(f'Failed to update title: {e!r}')
         return jsonify(error='Could not update title'), 500
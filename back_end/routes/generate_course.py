@@ -1,53 +1,28 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, g
 from back_end.extensions.firebase import db
 from datetime import datetime, timezone
 import time
-from back_end.tasks.worker import generate_reading_content, generate_test_content, generate_video_content, generate_assignment_content
-from langchain_openai import ChatOpenAI
-from langchain.output_parsers.pydantic import PydanticOutputParser
-from pydantic import BaseModel, Field
-from typing import List, Literal
-from back_end.utils.firestore import _delete_course
-from firebase_admin import auth as firebase_auth, firestore
+from back_end.tasks.worker import generate_outline
+from back_end.utils.task_registry import register_tasks
+from back_end.utils.auth import require_auth
 
 generate_course_bp = Blueprint('course', __name__)
 
-class LessonOutline(BaseModel):
-    title: str
-    type: Literal["reading", "test", "video", "assignment"] = Field(..., description="The type of lesson (must be 'reading', 'test', 'video', or 'assignment')")
-    description: str = Field(..., description="A short but thorough description of the lesson that matches with the type of the lesson. no more than 2 sentences.")
-
-class ModuleOutline(BaseModel):
-    title: str
-    lessons: List[LessonOutline]
-
-class CourseOutline(BaseModel):
-    modules: List[ModuleOutline]
-
 @generate_course_bp.route('/api/generate/course', methods=['POST'])
+@require_auth
 def course():
-    # Verify Firebase ID token
-    auth_header = request.headers.get('Authorization', '')
-    if not auth_header.startswith('Bearer '):
-        return jsonify({"error": "Missing or malformed Authorization header"}), 401
-
-    id_token = auth_header.split('Bearer ')[1]
-    try:
-        decoded_token = firebase_auth.verify_id_token(id_token)
-        uid = decoded_token['uid']
-    except Exception as e:
-        current_app.logger.error(f"Token verify failed: {e}")
-        return jsonify({"error": "Invalid auth token", "details": str(e)}), 401
+    uid = g.uid
 
     data = request.get_json()
     title       = data['title']
     topic       = data['topic']
     num_mod     = data['modules']
-    min_lessons = current_app.config['MIN_LESSONS']
-    max_lessons = current_app.config['MAX_LESSONS']
 
     types       = data['types']
-    print(types)
+    # opt out of reusing lessons generated for identical inputs in other courses
+    use_cache   = bool(data.get('generationCache', True))
+    # generate later modules only as the learner gets to them
+    lazy        = bool(data.get('lazyGeneration', current_app.config['LAZY_GENERATION']))
 
     allowed = ["reading"]
     if types.get("tests"):
@@ -56,53 +31,13 @@ def course():
         allowed.append("video")
     if types.get("assignments"):
         allowed.append("assignment")
-    print(allowed)
 
     if num_mod > 8:
             return jsonify({"error": "Too many modules"}), 404
 
-    # generate outline
-    BASE_MODEL = current_app.config['MODEL']
-    OPENROUTER_API_KEY = current_app.config['OPENROUTER_API_KEY']
-    outline_parser = PydanticOutputParser(pydantic_object=CourseOutline)
-    llm = ChatOpenAI(
-        model=BASE_MODEL,
-        api_key=OPENROUTER_API_KEY,
-        base_url="https://openrouter.ai/api/v1",
-        max_completion_tokens=2000,
-    ).with_structured_output(CourseOutline, method="json_schema")
-
-    outline_prompt = f"""
-    Generate a cohesive and slow, progressive course outline on **{topic}** with {num_mod} modules.
-    Each module should list {min_lessons}-{max_lessons} lesson titles.
-    Only create meaningful lesson titles that accurately describe the desirable content (do not add a lesson type prefix at the start of the title ex: 'Test:', 'Assignment:'.)
-    Ensure there is at least one test or assignment at the end of each module.
-    When generating a video lesson outline, don't choose a topic that is too niche.
-    Only choose assignment type when relevant to the topic. Titles and descriptions should accurately describe the assignment.
-    You are not required to include all lesson types in one module, but lesson type variety is encouraged. Choose the lesson type based on the cohesiveness and flow of learning of the course (test or assignment is required).
-    Interchange tests and assignments according to the course topic. For example, you would choose a test if the topic was math whereas you would choose an assignment if it was related to coding.
-    Do NOT generate any lesson whose type is not in {allowed}.
-    Return JSON matching:
-    {outline_parser.get_format_instructions()}
-    """
-    resp = llm.invoke([
-        {"role":"system","content":"You are a course outline generator."},
-        {"role":"user","content":outline_prompt}
-    ])
-    outline: CourseOutline = CourseOutline.model_validate(resp)
-
-    for mod in outline.modules:
-        mod.lessons = [lesson for lesson in mod.lessons if lesson.type in allowed]
-
-    print('outline: ', outline)
-
-    # persist outline & enqueue lesson tasks
+    # persist a stub course and hand the outline off to the worker
     timestamp   = str(int(time.time()))
     course_ref  = db.collection('users').document(uid).collection('courses').document(timestamp)
-    modules_ref = course_ref.collection('modules')
-
-    # compute total lessons
-    total_lessons = sum(len(mod.lessons) for mod in outline.modules)
 
     # save metadata and initialize progress tracking
     course_ref.set({
@@ -111,69 +46,29 @@ def course():
         "topic": topic,
         "createdAt": datetime.now(timezone.utc).isoformat(),
         "uid": uid,
-        "totalLessons": total_lessons,
+        "status": "outlining",
+        "totalLessons": 0,
+        "releasedLessons": 0,
         "generatedLessons": 0,
         "completedLessons": 0,
+        "counterShards": current_app.config['COUNTER_SHARDS'],
         "deleted": False,
+        "generationCache": use_cache,
+        "lazyGeneration": lazy,
         "error": None
     })
 
-    for mi, mod in enumerate(outline.modules, start=1):
-        mod_id = str(mi)
-        modules_ref.document(mod_id).set({"title": mod.title})
-        lessons_ref = modules_ref.document(mod_id).collection('lessons')
-
-        for li, lesson in enumerate(mod.lessons, start=1):
-            lesson_id = str(li)
-            lessons_ref.document(lesson_id).set({
-                "title": lesson.title,
-                "type": lesson.type,
-                "completed": False,
-                "description": lesson.description,
-            })
-            if lesson.type == "reading":
-                generate_reading_content.apply_async(kwargs={
-                    "uid": uid,
-                    "course_id": timestamp,
-                    "module_id": mod_id,
-                    "lesson_id": lesson_id,
-                    "lesson_title": lesson.title,
-                    "topic": topic,
-                    "mod_title": mod.title,
-                    "lesson_description": lesson.description
-                })
-            elif lesson.type == "test":
-                generate_test_content.apply_async(kwargs={
-                    "uid": uid,
-                    "course_id": timestamp,
-                    "module_id": mod_id,
-                    "lesson_id": lesson_id,
-                    "topic": topic,
-                    "lesson_titles": None,
-                    "mod_title": mod.title,
-                    "lesson_description": lesson.description
-                })
-            elif lesson.type == "video":
-                generate_video_content.apply_async(kwargs={
-                    "uid": uid,
-                    "course_id": timestamp,
-                    "module_id": mod_id,
-                    "lesson_id": lesson_id,
-                    "lesson_title": lesson.title,
-                    "topic": topic,
-                    "mod_title": mod.title,
-                    "lesson_description": lesson.description
-                })
-            elif lesson.type == "assignment":
-                generate_assignment_content.apply_async(kwargs={
-                    "uid": uid,
-                    "course_id": timestamp,
-                    "module_id": mod_id,
-                    "lesson_id": lesson_id,
-                    "lesson_title": lesson.title,
-                    "topic": topic,
-                    "mod_title": mod.title,
-                    "lesson_description": lesson.description
-                })
-
-    return jsonify({"id": timestamp}), 202
+    outline_task = generate_outline.signature(kwargs={
+        "uid": uid,
+        "course_id": timestamp,
+        "topic": topic,
+        "num_modules": num_mod,
+        "allowed": allowed,
+        "use_cache": use_cache,
+        "eager_modules": current_app.config['LAZY_EAGER_MODULES'] if lazy else None,
+    }, priority=0)  # every lesson of the course waits on its outline
+    # register the id before publishing, so a cancel can't miss the outline task
+    register_tasks(uid, timestamp, [outline_task.freeze().id])
+    outline_task.apply_async()
+
+    return jsonify({"id": timestamp, "status": "outlining"}), 202
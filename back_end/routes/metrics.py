@@ -0,0 +1,17 @@
+from flask import Blueprint, jsonify
+from back_end.utils.auth import require_auth, token_cache
+from back_end.utils.lesson_context import context_cache
+from back_end.utils.generation_cache import generation_cache_stats
+from back_end.tasks.youtube import quota_used
+
+metrics_bp = Blueprint('metrics_bp', __name__)
+
+@metrics_bp.route('/api/metrics', methods=['GET'])
+@require_auth
+def metrics():
+    return jsonify({
+        "authCache": token_cache.stats(),
+        "lessonContextCache": context_cache.stats(),
+        "generationCache": generation_cache_stats(),
+        "youtubeQuotaUsed": quota_used(),
+    }), 200
@@ -1,54 +1,56 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, jsonify, current_app, g
 from back_end.extensions.firebase import db
 from google.cloud.firestore_v1 import DocumentSnapshot
-from firebase_admin import auth as firebase_auth
+from back_end.utils.auth import require_auth
+from back_end.tasks.worker import release_upcoming_modules
 
 retrieve_lesson_bp = Blueprint("retrieve_lesson_bp", __name__)
 
+def with_content(lesson_data: dict, content_snap: DocumentSnapshot) -> dict:
+    """
+    Merge the lesson body (and citations, if any) into the lesson document's data.
+    """
+    if content_snap.exists:
+        content_dict = content_snap.to_dict()
+        lesson_data["content"] = content_dict.get("content")
+        if "citations" in content_dict:
+            lesson_data["citations"] = content_dict.get("citations")
+        # readings still being generated are served as far as they've been written
+        lesson_data["partial"] = content_dict.get("partial", False)
+    else:
+        lesson_data["content"] = None
+    return lesson_data
+
 @retrieve_lesson_bp.route(
     "/api/retrieve/courses/<course_id>/modules/<module_id>/lessons/<lesson_id>",
     methods=["GET"],
 )
+@require_auth
 def get_lesson_content(course_id, module_id, lesson_id):
     try:
-        # Verify Firebase ID token
-        auth_header = request.headers.get('Authorization', '')
-        if not auth_header.startswith('Bearer '):
-            return jsonify({"error": "Missing or malformed Authorization header"}), 401
+        uid = g.uid
 
-        id_token = auth_header.split('Bearer ')[1]
-        try:
-            decoded_token = firebase_auth.verify_id_token(id_token)
-            uid = decoded_token['uid']
-        except Exception as e:
-            current_app.logger.error(f"Token verify failed: {e}")
-            return jsonify({"error": "Invalid auth token", "details": str(e)}), 401
-        
-        # 1) Lesson document ref
+        # 1) Lesson, content and course document refs
+        course_ref = db.collection("users").document(uid).collection("courses").document(course_id)
         lesson_ref = (
-            db.collection("users").document(uid)
-              .collection("courses").document(course_id)
-              .collection("modules").document(module_id)
-              .collection("lessons").document(lesson_id)
+            course_ref.collection("modules").document(module_id)
+                      .collection("lessons").document(lesson_id)
         )
-        lesson_snap: DocumentSnapshot = lesson_ref.get()
+        content_ref = lesson_ref.collection("content").document("body")
+
+        # 2) One batched read for all three
+        snaps = {snap.reference.path: snap for snap in db.get_all([lesson_ref, content_ref, course_ref])}
+        lesson_snap: DocumentSnapshot = snaps[lesson_ref.path]
         if not lesson_snap.exists:
             return jsonify({"error": "Lesson not found"}), 404
 
-        lesson_data = lesson_snap.to_dict()
-
-        content_ref = lesson_ref.collection("content").document("body")
-        content_snap: DocumentSnapshot = content_ref.get()
-
-        if content_snap.exists:
-            content_dict = content_snap.to_dict()
-            lesson_data["content"] = content_dict.get("content")
-            if "citations" in content_dict:
-                lesson_data["citations"] = content_dict.get("citations")
-        else:
-            lesson_data["content"] = None
+        # 3) Lazy courses: opening a lesson queues its module and the next ones
+        try:
+            release_upcoming_modules(uid, course_id, snaps[course_ref.path].to_dict() or {}, module_id)
+        except Exception as e:
+            current_app.logger.warning(f"Could not release upcoming modules: {e!r}")
 
-        return jsonify(lesson_data), 200
+        return jsonify(with_content(lesson_snap.to_dict(), snaps[content_ref.path])), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -0,0 +1,65 @@
+import uuid
+from langchain_core.messages import HumanMessage, SystemMessage
+from back_end.celery_app import celery
+from back_end.config import Config
+from back_end.extensions.redis import redis_client
+from back_end.tasks.resources import get_client
+from back_end.utils.chat_sessions import session_key, load_session, release_summary_lock, store_summary, window_turns
+
+
+def schedule_summary(uid: str, session_id: str, older: int):
+    """
+    Fold the `older` turns that no longer fit the prompt window into the rolling summary,
+    in the background; at most one summary task per session at a time.
+    """
+    if older <= 0:
+        return
+    lock = session_key(uid, session_id, "summarizing")
+    token = uuid.uuid4().hex
+    if redis_client.set(lock, token, nx=True, ex=Config.CHAT_SUMMARY_LOCK_SECONDS):
+        summarize_chat_session.apply_async(kwargs={
+            "uid": uid,
+            "session_id": session_id,
+            "lock_token": token,
+        })
+
+@celery.task(name="summarize_chat_session")
+def summarize_chat_session(uid: str, session_id: str, lock_token: str = None):
+    """
+    Merge the turns that fell out of the prompt window into the rolling summary and trim them.
+    The window is recomputed here, so turns added while the task was queued are folded too.
+    The lock may expire while the task waits in the queue; if a second task summarized the
+    same turns meanwhile, store_summary refuses the stale result.
+    """
+    try:
+        summary, turns = load_session(uid, session_id)
+        _, older = window_turns(turns)
+        folded = turns[:older]
+        if not folded:
+            return {"status": "skipped"}
+
+        transcript = "\n".join(
+            f"{'Student' if t.get('from') == 'user' else 'Instructor'}: {t.get('text', '')}"
+            for t in folded
+        )
+        prompt = f"""
+        Update the running summary of a tutoring conversation with the new turns below.
+        Keep the facts, questions and explanations the student may refer back to; drop pleasantries.
+        Answer with the updated summary only, in under {Config.CHAT_SUMMARY_MAX_TOKENS} tokens.
+
+        Current summary:
+        {summary or 'None'}
+
+        New turns:
+        {transcript}
+        """
+        response = get_client("summary_llm").invoke([
+            SystemMessage(content="You maintain concise summaries of conversations."),
+            HumanMessage(content=prompt),
+        ])
+        if not store_summary(uid, session_id, summary, response.content.strip(), folded):
+            return {"status": "stale"}
+        return {"status": "ok", "folded": len(folded)}
+    finally:
+        if lock_token:
+            release_summary_lock(uid, session_id, lock_token)
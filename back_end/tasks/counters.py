@@ -0,0 +1,34 @@
+from back_end.celery_app import celery
+from back_end.extensions.firebase import db
+from back_end.extensions.redis import redis_client
+from back_end.utils.counters import increment_counter, read_counters
+from flask import current_app
+
+
+def record_progress(uid: str, course_id: str, field: str, amount: int = 1):
+    """
+    Bump a sharded course counter and schedule a debounced roll-up onto the course document.
+    """
+    course_ref = db.collection("users").document(uid) \
+                   .collection("courses").document(course_id)
+    increment_counter(course_ref, field, amount)
+
+    # at most one pending roll-up per course per window
+    window = current_app.config['COUNTER_ROLLUP_SECONDS']
+    if redis_client.set(f"counters:rollup:{uid}:{course_id}", 1, nx=True, ex=window):
+        rollup_course_counters.apply_async(
+            kwargs={"uid": uid, "course_id": course_id},
+            countdown=window,
+        )
+
+@celery.task(name="rollup_course_counters")
+def rollup_course_counters(uid: str, course_id: str):
+    """
+    Copy the summed shard values onto the course document the clients listen to.
+    """
+    course_ref = db.collection("users").document(uid) \
+                   .collection("courses").document(course_id)
+    totals = read_counters(course_ref)
+    if totals and course_ref.get().exists:
+        course_ref.update(totals)
+    return totals
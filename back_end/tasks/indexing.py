@@ -0,0 +1,33 @@
+from back_end.celery_app import celery
+from back_end.extensions.firebase import db
+from back_end.utils.embeddings import chunk_text, get_embedder
+from back_end.utils.lesson_context import invalidate_lesson_context
+
+
+@celery.task(name="index_lesson_content")
+def index_lesson_content(uid: str, course_id: str, module_id: str, lesson_id: str):
+    """
+    Chunk a reading lesson and store the chunk embeddings next to its content
+    (content/index) so chat can retrieve only the passages a question needs.
+    """
+    content_ref = db.collection("users").document(uid) \
+                    .collection("courses").document(course_id) \
+                    .collection("modules").document(module_id) \
+                    .collection("lessons").document(lesson_id) \
+                    .collection("content")
+
+    content = (content_ref.document("body").get().to_dict() or {}).get("content")
+    chunks = chunk_text(content) if isinstance(content, str) else []
+    if not chunks:
+        return {"status": "skipped", "lesson_id": lesson_id}
+
+    embedder = get_embedder()
+    vectors = embedder.embed(chunks)
+    content_ref.document("index").set({
+        "chunks": chunks,
+        "embeddings": vectors.tobytes(),
+        "dim": embedder.dim,
+        "embedder": embedder.name,
+    })
+    invalidate_lesson_context(uid, course_id)
+    return {"status": "ok", "lesson_id": lesson_id, "chunks": len(chunks)}
@@ -0,0 +1,54 @@
+import time
+from datetime import datetime, timedelta, timezone
+from back_end.celery_app import celery
+from back_end.extensions.firebase import db
+from back_end.extensions.redis import redis_client
+from back_end.utils.firestore import _delete_course
+from flask import current_app
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+
+@celery.task(name="purge_deleted_courses")
+def purge_deleted_courses():
+    """
+    Hard-delete courses that have been soft-deleted for longer than PURGE_GRACE_DAYS.
+
+    Each run handles at most PURGE_BATCH_SIZE courses, deletes at
+    PURGE_MAX_OPS_PER_SECOND and pauses between courses so it never competes
+    with live generation traffic for Firestore write throughput.
+    """
+    config = current_app.config
+
+    # never let two runs overlap if one is slower than the beat interval
+    if not redis_client.set("purge:lock", 1, nx=True, ex=config['PURGE_INTERVAL_SECONDS']):
+        return {"skipped": True}
+
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=config['PURGE_GRACE_DAYS'])).isoformat()
+    query = (
+        db.collection_group('courses')
+          .where(filter=FieldFilter('deleted', '==', True))
+          .where(filter=FieldFilter('deletedAt', '<=', cutoff))
+          .limit(config['PURGE_BATCH_SIZE'])
+    )
+
+    stats = {"courses": 0, "documents": 0, "failed": 0, "seconds": 0.0}
+    started = time.perf_counter()
+    try:
+        for snap in query.stream():
+            # the course may have been restored since the query ran
+            if not snap.reference.get().get('deleted'):
+                continue
+
+            uid = snap.reference.parent.parent.id
+            result = _delete_course(uid, snap.id, max_ops_per_second=config['PURGE_MAX_OPS_PER_SECOND'])
+            stats["courses"] += 1
+            stats["documents"] += result["deleted"]
+            stats["failed"] += result["failed"]
+
+            time.sleep(config['PURGE_PAUSE_SECONDS'])
+    finally:
+        stats["seconds"] = round(time.perf_counter() - started, 3)
+        redis_client.delete("purge:lock")
+        current_app.logger.info(f"Purged soft-deleted courses: {stats}")
+
+    return stats
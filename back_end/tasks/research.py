@@ -0,0 +1,82 @@
+import contextvars
+import hashlib
+import json
+from concurrent.futures import Future, ThreadPoolExecutor
+import redis
+from flask import current_app
+from back_end.config import Config
+from back_end.extensions.redis import redis_client
+from back_end.tasks.resources import tavily_search
+from back_end.utils.embeddings import decode_matrix, encode_matrix, get_embedder, top_k
+
+# Module research runs next to the outline stream; threads start lazily, so this is fork-safe.
+_executor = ThreadPoolExecutor(max_workers=Config.MODULE_RESEARCH_CONCURRENCY)
+
+def _corpus_key(uid: str, course_id: str, module_id: str) -> str:
+    return f"research:{uid}:{course_id}:{module_id}"
+
+def research_module(uid: str, course_id: str, module_id: str, topic: str, mod_title: str, lesson_titles: list[str]) -> int:
+    """
+    Run a module's web searches once and store the deduplicated corpus (with its
+    embeddings) for all of the module's reading lessons. Returns the number of documents.
+    """
+    queries = [f"{topic}: {mod_title}"]
+    if lesson_titles:
+        queries.append(f"{mod_title}: " + "; ".join(lesson_titles))
+
+    docs, seen = [], set()
+    for query in queries:
+        for res in tavily_search(query, max_results=Config.MODULE_RESEARCH_MAX_RESULTS):
+            url, content = res.get("url"), res.get("content")
+            if not url or not content:
+                continue
+            fingerprint = hashlib.sha1(" ".join(content.lower().split()).encode("utf-8")).hexdigest()
+            if url in seen or fingerprint in seen:
+                continue
+            seen.update((url, fingerprint))
+            docs.append({"title": res.get("title", ""), "url": url, "content": content})
+
+    embedder = get_embedder()
+    vectors = embedder.embed([f"{d['title']}\n{d['content']}" for d in docs]) if docs else None
+    redis_client.set(_corpus_key(uid, course_id, module_id), json.dumps({
+        "docs": docs,
+        "embeddings": encode_matrix(vectors) if docs else "",
+        "dim": embedder.dim,
+        "embedder": embedder.name,
+    }), ex=Config.MODULE_RESEARCH_TTL)
+    return len(docs)
+
+def start_module_research(uid: str, course_id: str, module_id: str, topic: str, mod_title: str, lesson_titles: list[str]) -> Future:
+    """
+    research_module on the shared thread pool (in the caller's app context).
+    A failed research pass is logged and the lessons fall back to their own searches.
+    """
+    def run():
+        try:
+            return research_module(uid, course_id, module_id, topic, mod_title, lesson_titles)
+        except Exception as e:
+            current_app.logger.warning(f"Research for module {module_id} of course {course_id} failed: {e!r}")
+            return 0
+
+    return _executor.submit(contextvars.copy_context().run, run)
+
+def load_module_corpus(uid: str, course_id: str, module_id: str):
+    """
+    The module's research corpus, or None if it was not researched (or has expired).
+    """
+    try:
+        cached = redis_client.get(_corpus_key(uid, course_id, module_id))
+    except redis.RedisError:
+        return None
+    return json.loads(cached) if cached else None
+
+def search_corpus(corpus: dict, query: str, k: int = Config.MODULE_RESEARCH_RESULTS_PER_QUERY) -> list[dict]:
+    """
+    The k corpus documents closest to `query`, in the same shape as tavily_search results.
+    """
+    docs = corpus["docs"]
+    embedder = get_embedder()
+    if corpus["embedder"] != embedder.name:
+        return docs[:k]
+    matrix = decode_matrix(corpus["embeddings"], corpus["dim"])
+    return [docs[i] for i in top_k(embedder.embed([query])[0], matrix, k)]
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import re
+import httpx
+import redis
+from celery.signals import worker_process_init
+from langchain_openai import ChatOpenAI
+from back_end.config import Config
+from back_end.extensions.redis import redis_client
+from back_end.utils.rate_limit import RateLimitedTransport
+
+# Long-lived clients and compiled agent graphs, built once per worker process
+# (after the prefork, so no connection is ever shared between processes).
+_clients = {}
+_agents = {}
+_agent_factories = {}
+
+def _http_client(rate_limited: bool = False) -> httpx.Client:
+    transport = httpx.HTTPTransport(limits=httpx.Limits(
+        max_connections=Config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=Config.HTTP_MAX_CONNECTIONS,
+    ))
+    return httpx.Client(
+        timeout=httpx.Timeout(Config.HTTP_TIMEOUT),
+        # LLM calls from every process share one set of OpenRouter limits, see utils/rate_limit.py
+        transport=RateLimitedTransport(transport) if rate_limited else transport,
+    )
+
+def _build_clients():
+    openrouter_http = _http_client(rate_limited=True)
+
+    def chat_model(model: str, **kwargs) -> ChatOpenAI:
+        return ChatOpenAI(
+            model=model,
+            api_key=Config.OPENROUTER_API_KEY,
+            base_url="https://openrouter.ai/api/v1",
+            http_client=openrouter_http,
+            **kwargs,
+        )
+
+    return {
+        "openrouter_http": openrouter_http,
+        "tavily_http": _http_client(),
+        "outline_llm": chat_model(Config.MODEL, max_completion_tokens=2000),
+        "test_llm": chat_model(Config.MODEL),
+        "reading_llm": chat_model(Config.LESSON_READING_MODEL_NAME),
+        "summary_llm": chat_model(Config.CHAT_MODEL_NAME, max_completion_tokens=Config.CHAT_SUMMARY_MAX_TOKENS),
+        "chat_llm": chat_model(Config.CHAT_MODEL_NAME, streaming=True, stream_usage=True),
+    }
+
+def get_client(name: str):
+    """
+    Return a pooled client ('openrouter_http', 'tavily_http', 'outline_llm', 'test_llm', 'reading_llm',
+    'summary_llm', 'chat_llm').
+    """
+    if not _clients:
+        _clients.update(_build_clients())
+    return _clients[name]
+
+def register_agent(name: str, factory):
+    """
+    Declare how to compile an agent graph; it is built once per process on first use or at worker start.
+    """
+    _agent_factories[name] = factory
+
+def get_agent(name: str):
+    if name not in _agents:
+        _agents[name] = _agent_factories[name]()
+    return _agents[name]
+
+@worker_process_init.connect
+def init_worker_resources(**kwargs):
+    _clients.clear()
+    _agents.clear()
+    _clients.update(_build_clients())
+    for name in _agent_factories:
+        get_agent(name)
+
+def _search_key(query: str, max_results: int, search_depth: str) -> str:
+    normalized = re.sub(r"\s+", " ", query).strip().lower()
+    digest = hashlib.sha256(f"{search_depth}|{max_results}|{normalized}".encode("utf-8")).hexdigest()
+    return f"tavily:{digest}"
+
+def tavily_search(query: str, max_results: int = 10, search_depth: str = "advanced") -> list[dict]:
+    """
+    Tavily search over the pooled keep-alive client. Returns the raw result dicts (title, url, content, ...).
+    Results are shared through Redis for TAVILY_CACHE_TTL, keyed on the normalized query.
+    """
+    key = _search_key(query, max_results, search_depth)
+    try:
+        cached = redis_client.get(key)
+    except redis.RedisError:
+        cached = None
+    if cached:
+        return json.loads(cached)
+
+    resp = get_client("tavily_http").post(
+        "https://api.tavily.com/search",
+        headers={"Authorization": f"Bearer {Config.TAVILY_API_KEY}"},
+        json={
+            "query": query,
+            "max_results": max_results,
+            "search_depth": search_depth,
+        },
+    )
+    resp.raise_for_status()
+    results = resp.json().get("results", [])
+    try:
+        redis_client.set(key, json.dumps(results), ex=Config.TAVILY_CACHE_TTL)
+    except redis.RedisError:
+        pass
+    return results
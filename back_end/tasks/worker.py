@@ -1,22 +1,177 @@
 from back_end.celery_app import celery
+from celery import group, chord
+from celery.result import GroupResult
+from celery.utils.time import get_exponential_backoff_interval
 from back_end.extensions.firebase import db
-from back_end.utils.firestore import _delete_course 
+from back_end.config import Config
 from flask import current_app
-from langchain_openai import ChatOpenAI
 from langgraph.prebuilt import create_react_agent
 import backoff
 from openai import RateLimitError, OpenAIError
 from langchain_core.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
 from typing import List, Dict
+from collections import Counter
 from datetime import datetime, timezone
+import time
 from google.cloud.firestore import Increment
-from googleapiclient.discovery import build
-import backoff
-from googleapiclient.errors import HttpError
-from langchain_community.tools.tavily_search import TavilySearchResults
+from google.cloud.firestore_v1 import transactional
+from google.cloud.firestore_v1.base_query import FieldFilter
 from langchain.agents import initialize_agent, AgentExecutor, tool
+from langchain_core.runnables import RunnableConfig
+from langchain_core.messages import AIMessageChunk
+from back_end.utils.lesson_context import invalidate_lesson_context
+from back_end.utils.generation_cache import generation_key, get_generation, set_generation
+from back_end.tasks.indexing import index_lesson_content
+from back_end.tasks.youtube import QuotaExceeded, resolve_videos
+from back_end.tasks.resources import get_agent, get_client, register_agent, tavily_search
+from back_end.tasks.research import load_module_corpus, search_corpus, start_module_research
+from back_end.utils.context_compression import compress_results
+from concurrent.futures import wait
+from typing import Literal
+from back_end.utils.outline_stream import ModuleStreamParser
+from back_end.utils.counters import read_counters
+from back_end.tasks.counters import record_progress
+from back_end.utils.task_registry import GenerationCancelled, register_tasks, raise_if_cancelled, is_cancelled, clear_cancelled
+
+
+def _run_agent(agent, inputs: dict, uid: str, course_id: str, config: dict = None, on_token=None) -> dict:
+    """
+    Run a LangGraph agent step by step, bailing out as soon as its course is cancelled.
+    Returns the final graph state, same as agent.invoke().
+    `on_token` receives the model's message chunks as they are generated.
+    """
+    if on_token is None:
+        state = None
+        for state in agent.stream(inputs, config=config, stream_mode="values"):
+            raise_if_cancelled(uid, course_id)
+        return state
+
+    state = None
+    for mode, payload in agent.stream(inputs, config=config, stream_mode=["values", "messages"]):
+        if mode == "values":
+            state = payload
+            raise_if_cancelled(uid, course_id)
+        else:
+            chunk, metadata = payload
+            if metadata.get("langgraph_node") == "agent" and isinstance(chunk, AIMessageChunk):
+                on_token(chunk)
+    return state
+
+
+class PartialContentWriter:
+    """
+    Collects the streamed answer of an agent and writes it to a lesson's content doc
+    as {"content": ..., "partial": True} while it is being generated. Writes are
+    throttled to one per READING_FLUSH_SECONDS and at least READING_FLUSH_MIN_CHARS
+    of new text; model turns that call tools are never written.
+    """
+
+    def __init__(self, content_ref):
+        self.content_ref = content_ref
+        self.turn = None
+        self.tool_turn = False
+        self.text = []
+        self.length = 0
+        self.flushed = 0
+        self.last_flush = time.monotonic()
+
+    def __call__(self, chunk: AIMessageChunk):
+        if chunk.id != self.turn:
+            # a new model call; only the last one is the answer
+            self.turn, self.tool_turn = chunk.id, False
+            self.text, self.length, self.flushed = [], 0, 0
+        if chunk.tool_call_chunks:
+            self.tool_turn = True
+        if isinstance(chunk.content, str) and chunk.content:
+            self.text.append(chunk.content)
+            self.length += len(chunk.content)
+
+        now = time.monotonic()
+        if (not self.tool_turn
+                and self.length - self.flushed >= current_app.config['READING_FLUSH_MIN_CHARS']
+                and now - self.last_flush >= current_app.config['READING_FLUSH_SECONDS']):
+            self.content_ref.set({"content": "".join(self.text), "partial": True}, merge=True)
+            self.flushed, self.last_flush = self.length, now
+
+
+def _save_lesson_content(lesson_ref, content: dict, lesson_fields: dict = None):
+    """
+    Write the generated content and flip the lesson to 'done' in one commit
+    (along with any extra `lesson_fields`).
+    """
+    batch = db.batch()
+    batch.set(lesson_ref.collection("content").document("body"), content, merge=True)
+    batch.update(lesson_ref, {"status": "done", "error": None, **(lesson_fields or {})})
+    batch.commit()
+
+def _after_save(uid: str, course_id: str, generated: int = 1, follow_ups: tuple = ()):
+    """
+    Bookkeeping once lesson content is committed: refresh the chat's lesson context, run
+    any `follow_ups` and count `generated` lessons. Runs outside the tasks' retry handling
+    and only logs failures, so a saved lesson is never regenerated (or failed) over them.
+    """
+    steps = [lambda: invalidate_lesson_context(uid, course_id), *follow_ups]
+    if generated:
+        steps.append(lambda: record_progress(uid, course_id, "generatedLessons", generated))
+    for step in steps:
+        try:
+            step()
+        except Exception:
+            current_app.logger.exception(f"Bookkeeping after saving lessons of course {course_id} failed")
+
+def _mark_cancelled(lesson_refs: list):
+    """
+    Flag lessons whose task stopped because the course was cancelled (dropping any
+    streamed draft), so regenerate_failed_lessons picks them up again.
+    """
+    batch = db.batch()
+    for lesson_ref in lesson_refs:
+        batch.update(lesson_ref, {"status": "cancelled"})
+        batch.delete(lesson_ref.collection("content").document("body"))
+    batch.commit()
+
+def _generate_cached(key, generate):
+    """
+    Serve lesson content from the cross-user generation cache, or generate and store it.
+    `key` is None when the course opted out of the cache.
+    """
+    content = get_generation(key) if key else None
+    if content is None:
+        content = generate()
+        if key:
+            set_generation(key, content)
+    return content
+
+def _record_generation_error(uid: str, course_id: str, exc: Exception):
+    db.collection('users').document(uid) \
+      .collection('generation_errors').document(course_id) \
+      .set({'error': str(exc), 'failedAt': datetime.now(timezone.utc).isoformat()})
+
+def _retry_countdown(retries: int) -> float:
+    return get_exponential_backoff_interval(
+        factor=current_app.config['LESSON_RETRY_BACKOFF'],
+        retries=retries,
+        maximum=current_app.config['LESSON_RETRY_BACKOFF_MAX'],
+        full_jitter=True,
+    )
+
+def _retry_or_fail(task, exc: Exception, uid: str, course_id: str, module_id: str, lesson_id: str, lesson_ref) -> dict:
+    """
+    Retry a lesson task with jittered exponential backoff; once retries are
+    exhausted mark just that lesson as failed instead of failing the course.
+    """
+    retries = task.request.retries
+    if retries < task.max_retries:
+        lesson_ref.update({"status": "pending", "attempts": retries + 1})
+        raise task.retry(exc=exc, countdown=_retry_countdown(retries))
 
+    batch = db.batch()
+    batch.update(lesson_ref, {"status": "failed", "error": str(exc)})
+    batch.delete(lesson_ref.collection("content").document("body"))  # a streamed reading's draft
+    batch.commit()
+    _record_generation_error(uid, course_id, exc)
+    return {"status": "failed", "module_id": module_id, "lesson_id": lesson_id}
 
 @backoff.on_exception(backoff.expo, (RateLimitError, OpenAIError), factor=20, max_tries=2)
 def call_assignment_agent(agent, prompt):
@@ -28,9 +183,10 @@ def call_assignment_agent(agent, prompt):
     })
     return resp
 
-@celery.task(bind=True, name="generate_reading_content")
-def generate_assignment_content(self, uid: str, course_id: str, module_id: str, lesson_id: str, lesson_title: str, topic: str, mod_title: str, lesson_description: str):
-    llm = current_app.config['LESSON_READING_MODEL']
+register_agent("assignment", lambda: create_react_agent(model=get_client("reading_llm"), tools=[]))
+
+@celery.task(bind=True, name="generate_assignment_content", max_retries=Config.LESSON_MAX_RETRIES)
+def generate_assignment_content(self, uid: str, course_id: str, module_id: str, lesson_id: str, lesson_title: str, topic: str, mod_title: str, lesson_description: str, use_cache: bool = True):
     prompt = f"""
     You are an expert instructor on {topic} and specifically {mod_title}.
     Write an in-depth, well-structured informative assignment for **{lesson_title}** based on this description:
@@ -42,184 +198,117 @@ def generate_assignment_content(self, uid: str, course_id: str, module_id: str,
     Math equations are to be wrapped with '$$' for blocks and '$' for inline. Lines with '$$' are to have no other characters on the same line.
     Only return the task for the user. No comments.
     """
-    agent = create_react_agent(model=llm, tools=[])
+    agent = get_agent("assignment")
 
     lesson_ref = db.collection("users").document(uid) \
                    .collection("courses").document(course_id) \
                    .collection("modules").document(module_id) \
                    .collection("lessons").document(lesson_id)
-    course_ref = db.collection("users").document(uid) \
-                   .collection("courses").document(course_id)
 
-    try:
-        resp = agent.invoke({
+    def generate():
+        resp = _run_agent(agent, {
             "messages": [
                 {"role": "system", "content": "You are a detailed lesson writer."},
                 {"role": "user", "content": prompt}
             ]
-        })
-        content = resp["messages"][-1].content
+        }, uid, course_id)
+        return resp["messages"][-1].content
 
-        content_doc = lesson_ref.collection("content").document("body")
-        content_doc.set({
-            "content": content
-        }, merge=True)
+    cache_key = generation_key(
+        "assignment", Config.LESSON_READING_MODEL_NAME,
+        topic=topic, mod_title=mod_title, lesson_title=lesson_title, lesson_description=lesson_description,
+    ) if use_cache else None
 
+    try:
+        lesson_ref.update({"status": "generating"})
+        content = _generate_cached(cache_key, generate)
+        raise_if_cancelled(uid, course_id)
 
-        # update status and counters
-        course_ref.set({"generatedLessons": Increment(1)}, merge=True)
-        return {"status": "ok", "lesson_id": lesson_id}
+        _save_lesson_content(lesson_ref, {
+            "content": content
+        })
+    except GenerationCancelled:
+        _mark_cancelled([lesson_ref])
+        return {"status": "cancelled", "module_id": module_id, "lesson_id": lesson_id}
     except Exception as e:
-        db.collection('users').document(uid) \
-          .collection('generation_errors').document(course_id) \
-          .set({'error': str(e), 'failedAt': datetime.now(timezone.utc).isoformat()})
-        _delete_course(uid, course_id)
-        raise
-
-
-@backoff.on_exception(backoff.expo, HttpError, max_tries=3, factor=2)
-def search_youtube_videos(
-    query: str,
-    api_key: str,
-    max_results: int = 10,
-    video_duration: str = "medium",
-) -> List[Dict]:
-    youtube = build("youtube", "v3", developerKey=api_key)
-    all_items = []
-    seen_ids = set()
-
-    # 1) build params dict
-    params = {
-        "part": "snippet",
-        "q": query,
-        "type": "video",
-        "videoEmbeddable": "true",
-        "maxResults": max_results,
-        "order": "viewCount",
-        "videoDuration": video_duration,
-    }
+        return _retry_or_fail(self, e, uid, course_id, module_id, lesson_id, lesson_ref)
 
-    # 2) execute the search with those params
-    resp = youtube.search().list(**params).execute()
-    for item in resp.get("items", []):
-        vid = item["id"]["videoId"]
-        if vid not in seen_ids:
-            seen_ids.add(vid)
-            all_items.append(item)
-
-    return all_items
-
-@backoff.on_exception(backoff.expo, HttpError, max_tries=3, factor=2)
-def fetch_video_stats(api_key: str, video_ids: List[str]) -> Dict[str, Dict]:
-    """
-    Returns a mapping videoId -> { viewCount: int, likeCount: int, ... }
-    """
-    youtube = build("youtube", "v3", developerKey=api_key)
-    resp = youtube.videos().list(
-        part="statistics",
-        id=",".join(video_ids),
-        maxResults=len(video_ids)
-    ).execute()
-    stats = {}
-    for item in resp.get("items", []):
-        stats[item["id"]] = {
-            "viewCount": int(item["statistics"].get("viewCount", 0)),
-            "likeCount": int(item["statistics"].get("likeCount", 0)),
-        }
-    return stats
-
-def score_video(snippet: Dict, stat: Dict) -> float:
-    """
-    Simple score combining recency and popularity:
-      - More recent → higher score
-      - More views → higher score
-    """
-    # recency factor: days since published, capped at 30 days
-    published_at = datetime.fromisoformat(snippet["publishedAt"].replace("Z", "+00:00"))
-    age_days = (datetime.now(timezone.utc) - published_at).days
-    recency_score = max(0, 365*5 - age_days)  # 0–5 years, then clamps at 0
-
-    view_score = stat["viewCount"] / 1000.0  # 1 point per 1,000 views
-    return recency_score * 1 + view_score * 1.2
-
-@celery.task(bind=True, name="generate_video_content")
-def generate_video_content(
-    self,
-    uid: str,
-    course_id: str,
-    module_id: str,
-    lesson_id: str,
-    lesson_title: str,
-    topic: str,
-    mod_title: str,
-    lesson_description: str
-):
-    YOUTUBE_API_KEY = current_app.config['YOUTUBE_API_KEY']
-
-    lesson_ref = (
-        db.collection("users").document(uid)
-          .collection("courses").document(course_id)
-          .collection("modules").document(module_id)
-          .collection("lessons").document(lesson_id)
-    )
-    course_ref = (
-        db.collection("users").document(uid)
-          .collection("courses").document(course_id)
-    )
-
-    try:
-        query = f"{mod_title} - {lesson_title}"
-        videos = search_youtube_videos(
-            query=query,
-            api_key=YOUTUBE_API_KEY,
-            max_results=10,
-            video_duration="medium"
-        )
-        if not videos:
-            raise ValueError(f"No videos found for '{query}'")
+    _after_save(uid, course_id)
+    return {"status": "ok", "module_id": module_id, "lesson_id": lesson_id}
 
-        # 2) Fetch stats in bulk
-        ids = [v["id"]["videoId"] for v in videos]
-        stats_map = fetch_video_stats(YOUTUBE_API_KEY, ids)
 
-        # 3) Score & pick the best
-        best = max(
-            videos,
-            key=lambda v: score_video(v["snippet"], stats_map.get(v["id"]["videoId"], {"viewCount":0}))
-        )
+@celery.task(bind=True, name="resolve_course_videos", max_retries=Config.LESSON_MAX_RETRIES)
+def resolve_course_videos(self, uid: str, course_id: str, lessons: list[dict], use_cache: bool = True):
+    """
+    Find the videos for all of a course's video lessons in one pass and write them
+    in one batch. `lessons` holds {module_id, lesson_id, query} items; returns one
+    result per lesson, like the other lesson tasks.
+    """
+    course_ref = db.collection("users").document(uid) \
+                   .collection("courses").document(course_id)
+    lesson_refs = [
+        course_ref.collection("modules").document(lesson["module_id"])
+                  .collection("lessons").document(lesson["lesson_id"])
+        for lesson in lessons
+    ]
 
-        vid_id = best["id"]["videoId"]
-        snip  = best["snippet"]
+    def results(status: str) -> list[dict]:
+        return [{"status": status, "module_id": l["module_id"], "lesson_id": l["lesson_id"]} for l in lessons]
 
-        # 4) Build payload
-        video_content = {
-            "videoId":    vid_id,
-            "title":      snip["title"],
-            "description": snip["description"],
-            "thumbnail":  snip["thumbnails"]["high"]["url"],
-            "url":        f"https://www.youtube.com/watch?v={vid_id}",
-        }
+    try:
+        raise_if_cancelled(uid, course_id)
+        batch = db.batch()
+        for lesson_ref in lesson_refs:
+            batch.update(lesson_ref, {"status": "generating"})
+        batch.commit()
 
-        # 5) Persist to Firestore
-        lesson_ref.collection("content").document("body").set(
-            {"content": video_content}, merge=True
+        videos = resolve_videos(
+            current_app.config['YOUTUBE_API_KEY'],
+            [lesson["query"] for lesson in lessons],
+            use_cache,
         )
-        # 6) Increment generated counter
-        course_ref.set({"generatedLessons": Increment(1)}, merge=True)
+        raise_if_cancelled(uid, course_id)
 
+        batch = db.batch()
+        outcome = []
+        for lesson, lesson_ref in zip(lessons, lesson_refs):
+            video = videos.get(lesson["query"])
+            if video:
+                batch.set(lesson_ref.collection("content").document("body"), {"content": video}, merge=True)
+                batch.update(lesson_ref, {"status": "done", "error": None})
+            else:
+                batch.update(lesson_ref, {"status": "failed", "error": f"No videos found for '{lesson['query']}'"})
+            outcome.append({
+                "status": "ok" if video else "failed",
+                "module_id": lesson["module_id"],
+                "lesson_id": lesson["lesson_id"],
+            })
+        batch.commit()
+    except GenerationCancelled:
+        _mark_cancelled(lesson_refs)
+        return results("cancelled")
     except Exception as e:
-        # Log failure and clean up
-        db.collection("users").document(uid) \
-          .collection("generation_errors").document(course_id) \
-          .set({
-            "error":    str(e),
-            "failedAt": datetime.now(timezone.utc).isoformat()
-          })
-        # Optionally delete course if critical
-        _delete_course(uid, course_id)
-        raise
+        # retrying can't help once today's quota is gone
+        retries = self.request.retries
+        if retries < self.max_retries and not isinstance(e, QuotaExceeded):
+            batch = db.batch()
+            for lesson_ref in lesson_refs:
+                batch.update(lesson_ref, {"status": "pending", "attempts": retries + 1})
+            batch.commit()
+            raise self.retry(exc=e, countdown=_retry_countdown(retries))
 
+        batch = db.batch()
+        for lesson_ref in lesson_refs:
+            batch.update(lesson_ref, {"status": "failed", "error": str(e)})
+        batch.set(
+            db.collection('users').document(uid).collection('generation_errors').document(course_id),
+            {'error': str(e), 'failedAt': datetime.now(timezone.utc).isoformat()},
+        )
+        batch.commit()
+        return results("failed")
 
+    _after_save(uid, course_id, generated=sum(1 for r in outcome if r["status"] == "ok"))
+    return outcome
 
 class QuestionItem(BaseModel):
     question: str = Field(description="The question text")
@@ -230,21 +319,25 @@ class QuestionItem(BaseModel):
 class ResponseList(BaseModel):
     questions: List[QuestionItem]
 
+register_agent("test", lambda: create_react_agent(model=get_client("test_llm"), tools=[], response_format=ResponseList))
+
 @backoff.on_exception(backoff.expo, (RateLimitError, OpenAIError), factor=20, max_tries=2)
-def call_test_agent(agent, prompt):
-    output = agent.invoke(
+def call_test_agent(agent, prompt, uid: str, course_id: str):
+    output = _run_agent(
+        agent,
         {"messages":[
             {"role": "system", "content": "You are a helpful multiple choice generator"},
             {"role":"user","content": prompt}
         ]},
+        uid, course_id,
         config={"recursion_limit": 50}
     )
     result: ResponseList = output["structured_response"]
     content = [q.model_dump() for q in result.questions]
     return content
 
-@celery.task(bind=True, name="generate_test_content")
-def generate_test_content(self, uid: str, course_id: str, module_id: str, lesson_id: str, topic: str, lesson_titles: list[str], mod_title: str, lesson_description: str):
+@celery.task(bind=True, name="generate_test_content", max_retries=Config.LESSON_MAX_RETRIES)
+def generate_test_content(self, uid: str, course_id: str, module_id: str, lesson_id: str, topic: str, lesson_titles: list[str], mod_title: str, lesson_description: str, use_cache: bool = True):
     NUM_QUESTIONS   = current_app.config['NUM_QUESTIONS']
     parser          = PydanticOutputParser(pydantic_object=ResponseList)
 
@@ -266,39 +359,65 @@ def generate_test_content(self, uid: str, course_id: str, module_id: str, lesson
     - Explanations are brief (max 2 sentences).
     """
 
-    llm = current_app.config['TEST_MODEL']
-    agent = create_react_agent(model=llm, tools=[], response_format=ResponseList)
+    agent = get_agent("test")
 
     lesson_ref = db.collection("users").document(uid) \
                    .collection("courses").document(course_id) \
                    .collection("modules").document(module_id) \
                    .collection("lessons").document(lesson_id)
-    course_ref = db.collection("users").document(uid) \
-                   .collection("courses").document(course_id)
+
+    cache_key = generation_key(
+        "test", Config.MODEL,
+        topic=topic, lesson_titles=lesson_titles, mod_title=mod_title,
+        lesson_description=lesson_description, num_questions=NUM_QUESTIONS,
+    ) if use_cache else None
 
     try:
-        content = call_test_agent(agent, prompt)
+        lesson_ref.update({"status": "generating"})
+        content = _generate_cached(cache_key, lambda: call_test_agent(agent, prompt, uid, course_id))
+        raise_if_cancelled(uid, course_id)
 
-        content_doc = lesson_ref.collection("content").document("body")
-        content_doc.set({
+        _save_lesson_content(lesson_ref, {
             "content": content
-        }, merge=True)
-
-        course_ref.set({"generatedLessons": Increment(1)}, merge=True)
+        })
+    except GenerationCancelled:
+        _mark_cancelled([lesson_ref])
+        return {"status": "cancelled", "module_id": module_id, "lesson_id": lesson_id}
     except Exception as e:
-        db.collection('users').document(uid) \
-          .collection('generation_errors').document(course_id) \
-          .set({'error': str(e), 'failedAt': datetime.now(timezone.utc).isoformat()})
-        _delete_course(uid, course_id)
-        raise
+        return _retry_or_fail(self, e, uid, course_id, module_id, lesson_id, lesson_ref)
 
+    _after_save(uid, course_id)
+    return {"status": "ok", "module_id": module_id, "lesson_id": lesson_id}
 
 
-@celery.task(bind=True, name="generate_reading_content")
-def generate_reading_content(self, uid: str, course_id: str, module_id: str, lesson_id: str, lesson_title: str, topic: str, mod_title: str, lesson_description: str):
-    MINIMUM_WORDS      = current_app.config['MIN_WORDS']
 
-    llm = current_app.config['LESSON_READING_MODEL']
+@tool
+def retrieve_context(query: str, config: RunnableConfig) -> str:
+    """Use this to retrieve relevant context on the web for test generation."""
+    # the module's shared research corpus when there is one, else a (cached) web search
+    corpus = config["configurable"].get("corpus")
+    search_results = search_corpus(corpus, query) if corpus and corpus["docs"] else tavily_search(query)
+
+    # only deduplicated, relevant passages within the token budget reach the agent
+    context, kept, raw_tokens, kept_tokens = compress_results(
+        search_results, query, focus=config["configurable"].get("focus")
+    )
+    config["configurable"]["context_tokens"]["raw"] += raw_tokens
+    config["configurable"]["context_tokens"]["kept"] += kept_tokens
+
+    citation = [
+        {"title": search_results[i]["title"], "url": search_results[i]["url"]}
+        for i in kept
+        if "title" in search_results[i] and "url" in search_results[i]
+    ]
+    config["configurable"]["citations"].extend(citation)
+    return context
+
+register_agent("reading", lambda: create_react_agent(model=get_client("reading_llm"), tools=[retrieve_context]))
+
+@celery.task(bind=True, name="generate_reading_content", max_retries=Config.LESSON_MAX_RETRIES)
+def generate_reading_content(self, uid: str, course_id: str, module_id: str, lesson_id: str, lesson_title: str, topic: str, mod_title: str, lesson_description: str, use_cache: bool = True):
+    MINIMUM_WORDS      = current_app.config['MIN_WORDS']
 
     prompt = f"""
     You are an expert instructor on {topic} and specifically {mod_title}.
@@ -313,60 +432,646 @@ def generate_reading_content(self, uid: str, course_id: str, module_id: str, les
     Only return the textbook passage content. No comments.
     """
 
-    citations = []
-    search_tool = TavilySearchResults(
-        api_key=current_app.config['TAVILY_API_KEY'], 
-        max_results=10, 
-        search_depth='advanced'
-    )
-
-    @tool
-    def retrieve_context(query: str) -> str:
-        """Use this to retrieve relevant context on the web for test generation."""
-        search_results = search_tool.invoke(query)
-        citation = [
-            {"title": res["title"], "url": res["url"]}
-            for res in search_results
-            if "title" in res and "url" in res
-        ]
-        citations.extend(citation)
-        return "\n\n".join(
-            f"{res.get('title', '')}\n{res.get('content', '')}"
-            for res in search_results
-            if "content" in res
-        )
-
-    agent = create_react_agent(model=llm, tools=[retrieve_context])
+    agent = get_agent("reading")
 
     lesson_ref = db.collection("users").document(uid) \
                    .collection("courses").document(course_id) \
                    .collection("modules").document(module_id) \
                    .collection("lessons").document(lesson_id)
-    course_ref = db.collection("users").document(uid) \
-                   .collection("courses").document(course_id)
 
-    try:
-        resp = agent.invoke({
+    def generate():
+        # per-request state reaches the shared tool through the run config
+        citations = []
+        corpus = load_module_corpus(uid, course_id, module_id)
+        on_token = None
+        if current_app.config['READING_STREAMING']:
+            on_token = PartialContentWriter(lesson_ref.collection("content").document("body"))
+        resp = _run_agent(agent, {
             "messages": [
                 {"role": "system", "content": "You are a detailed lesson writer."},
                 {"role": "user", "content": prompt}
             ]
+        }, uid, course_id, config={"configurable": {
+            "citations": citations,
+            "corpus": corpus,
+            "focus": f"{lesson_title}. {lesson_description}",
+            "context_tokens": context_tokens,
+        }}, on_token=on_token)
+        return {
+            "content": resp["messages"][-1].content,
+            "citations": citations,
+        }
+
+    # search context tokens before and after compression, summed over the agent's tool calls
+    context_tokens = {"raw": 0, "kept": 0}
+
+    cache_key = generation_key(
+        "reading", Config.LESSON_READING_MODEL_NAME,
+        topic=topic, mod_title=mod_title, lesson_title=lesson_title,
+        lesson_description=lesson_description, min_words=MINIMUM_WORDS,
+    ) if use_cache else None
+
+    try:
+        lesson_ref.update({"status": "generating"})
+        content = _generate_cached(cache_key, generate)
+        raise_if_cancelled(uid, course_id)
+
+        if context_tokens["raw"]:
+            context_tokens["saved"] = context_tokens["raw"] - context_tokens["kept"]
+            current_app.logger.info(f"Lesson {course_id}/{module_id}/{lesson_id}: search context {context_tokens}")
+        _save_lesson_content(lesson_ref, {**content, "partial": False},
+                             {"contextTokens": context_tokens} if context_tokens["raw"] else None)
+    except GenerationCancelled:
+        _mark_cancelled([lesson_ref])
+        return {"status": "cancelled", "module_id": module_id, "lesson_id": lesson_id}
+    except Exception as e:
+        return _retry_or_fail(self, e, uid, course_id, module_id, lesson_id, lesson_ref)
+
+    _after_save(uid, course_id, follow_ups=(lambda: index_lesson_content.apply_async(kwargs={
+        "uid": uid,
+        "course_id": course_id,
+        "module_id": module_id,
+        "lesson_id": lesson_id,
+    }),))
+    return {"status": "ok", "module_id": module_id, "lesson_id": lesson_id}
+
+
+
+class LessonOutline(BaseModel):
+    title: str
+    type: Literal["reading", "test", "video", "assignment"] = Field(..., description="The type of lesson (must be 'reading', 'test', 'video', or 'assignment')")
+    description: str = Field(..., description="A short but thorough description of the lesson that matches with the type of the lesson. no more than 2 sentences.")
+
+class ModuleOutline(BaseModel):
+    title: str
+    lessons: List[LessonOutline]
+
+class CourseOutline(BaseModel):
+    modules: List[ModuleOutline]
+
+def _outline_messages(topic: str, num_modules: int, allowed: list[str]) -> list[dict]:
+    min_lessons = current_app.config['MIN_LESSONS']
+    max_lessons = current_app.config['MAX_LESSONS']
+    outline_parser = PydanticOutputParser(pydantic_object=CourseOutline)
+
+    outline_prompt = f"""
+    Generate a cohesive and slow, progressive course outline on **{topic}** with {num_modules} modules.
+    Each module should list {min_lessons}-{max_lessons} lesson titles.
+    Only create meaningful lesson titles that accurately describe the desirable content (do not add a lesson type prefix at the start of the title ex: 'Test:', 'Assignment:'.)
+    Ensure there is at least one test or assignment at the end of each module.
+    When generating a video lesson outline, don't choose a topic that is too niche.
+    Only choose assignment type when relevant to the topic. Titles and descriptions should accurately describe the assignment.
+    You are not required to include all lesson types in one module, but lesson type variety is encouraged. Choose the lesson type based on the cohesiveness and flow of learning of the course (test or assignment is required).
+    Interchange tests and assignments according to the course topic. For example, you would choose a test if the topic was math whereas you would choose an assignment if it was related to coding.
+    Do NOT generate any lesson whose type is not in {allowed}.
+    Return JSON matching:
+    {outline_parser.get_format_instructions()}
+    """
+    return [
+        {"role":"system","content":"You are a course outline generator."},
+        {"role":"user","content":outline_prompt}
+    ]
+
+def _stream_outline_modules(llm, messages):
+    """
+    Stream the outline and yield each ModuleOutline as soon as its JSON object closes.
+    Raises once the stream ends if the document was cut off (token limit or malformed JSON).
+    """
+    parser = ModuleStreamParser()
+    response_format = {
+        "type": "json_schema",
+        "json_schema": {"name": "CourseOutline", "schema": CourseOutline.model_json_schema()},
+    }
+    finish_reason = None
+    for chunk in llm.stream(messages, response_format=response_format):
+        finish_reason = chunk.response_metadata.get("finish_reason") or finish_reason
+        for module in parser.feed(chunk.content):
+            yield ModuleOutline.model_validate(module)
+    if finish_reason == "length":
+        raise ValueError("Outline was cut off at the token limit")
+    if not parser.complete:
+        raise ValueError("Outline ended before its JSON document closed")
+
+def _lesson_signature(uid: str, course_id: str, topic: str, mod_id: str, mod_title: str, lesson_id: str, lesson: LessonOutline, use_cache: bool = True, priority: int = None):
+    """
+    Build the content-generation task signature for one lesson.
+    Video lessons are resolved per course instead, see _video_signature.
+    """
+    kwargs = {
+        "uid": uid,
+        "course_id": course_id,
+        "module_id": mod_id,
+        "lesson_id": lesson_id,
+        "topic": topic,
+        "mod_title": mod_title,
+        "lesson_description": lesson.description,
+        "use_cache": use_cache,
+    }
+    if priority is None:
+        priority = _lesson_priority(mod_id, lesson_id)
+    if lesson.type == "test":
+        return generate_test_content.s(lesson_titles=None, **kwargs).set(priority=priority)
+
+    task = {
+        "reading": generate_reading_content,
+        "assignment": generate_assignment_content,
+    }[lesson.type]
+    return task.s(lesson_title=lesson.title, **kwargs).set(priority=priority)
+
+def _lesson_priority(mod_id: str, lesson_id: str) -> int:
+    """
+    Broker priority of a lesson task, 0 runs first (outlines use 0): a course's first
+    lesson, then its lessons module by module, so the early lessons of every course
+    are ready before the later lessons of any course.
+    """
+    if mod_id == "1" and lesson_id == "1":
+        return 1
+    return min(9, 1 + int(mod_id))
+
+def _video_signature(uid: str, course_id: str, videos: list[dict], use_cache: bool = True):
+    """
+    One resolve_course_videos signature for the given video lessons (None if there are none).
+    """
+    if not videos:
+        return None
+    return resolve_course_videos.s(uid=uid, course_id=course_id, lessons=videos, use_cache=use_cache) \
+                                .set(priority=1)
+
+def _video_lesson(mod_id: str, mod_title: str, lesson_id: str, lesson: LessonOutline) -> dict:
+    return {"module_id": mod_id, "lesson_id": lesson_id, "query": f"{mod_title} - {lesson.title}"}
+
+def _write_module(batch, uid: str, course_id: str, topic: str, mod_id: str, mod: ModuleOutline, use_cache: bool = True, deferred: bool = False) -> tuple[list, list]:
+    """
+    Stage one module and its lessons on a write batch.
+    Returns the lesson task signatures and the video lessons (resolved per course);
+    a `deferred` module's lessons wait for release_modules instead.
+    """
+    module_ref  = db.collection("users").document(uid) \
+                    .collection("courses").document(course_id) \
+                    .collection("modules").document(mod_id)
+    batch.set(module_ref, {"title": mod.title})
+    lessons_ref = module_ref.collection('lessons')
+
+    signatures, videos = [], []
+    for li, lesson in enumerate(mod.lessons, start=1):
+        lesson_id = str(li)
+        batch.set(lessons_ref.document(lesson_id), {
+            "title": lesson.title,
+            "type": lesson.type,
+            "completed": False,
+            "description": lesson.description,
+            "status": "deferred" if deferred else "pending",
         })
-        content = resp["messages"][-1].content
+        if deferred:
+            continue
+        if lesson.type == "video":
+            videos.append(_video_lesson(mod_id, mod.title, lesson_id, lesson))
+        else:
+            signatures.append(_lesson_signature(uid, course_id, topic, mod_id, mod.title, lesson_id, lesson, use_cache))
+    return signatures, videos
 
-        content_doc = lesson_ref.collection("content").document("body")
-        content_doc.set({
-            "content": content,
-            "citations": citations,
-        }, merge=True)
+def _start_research(uid: str, course_id: str, topic: str, mod_id: str, mod: ModuleOutline):
+    """
+    Start the module's shared research pass, or return None if it is disabled or
+    the module has no reading lessons.
+    """
+    readings = [lesson.title for lesson in mod.lessons if lesson.type == "reading"]
+    if not current_app.config['MODULE_RESEARCH'] or not readings:
+        return None
+    return start_module_research(uid, course_id, mod_id, topic, mod.title, readings)
+
+def _register_signatures(uid: str, course_id: str, signatures: list) -> list[str]:
+    """
+    Pin task ids on the signatures and record them in the course's task registry
+    before anything is published, so a cancel can never miss a task.
+    """
+    task_ids = [sig.freeze().id for sig in signatures]
+    register_tasks(uid, course_id, task_ids)
+    return task_ids
 
+@celery.task(bind=True, name="generate_outline")
+def generate_outline(self, uid: str, course_id: str, topic: str, num_modules: int, allowed: list[str], use_cache: bool = True, eager_modules: int = None):
+    """
+    Outline the course and start generating its lessons. With `eager_modules` (lazy
+    courses) only the first that many modules are generated now, see release_modules.
+    """
+    llm = get_client("outline_llm")
+    messages = _outline_messages(topic, num_modules, allowed)
 
-        # update status and counters
-        course_ref.set({"generatedLessons": Increment(1)}, merge=True)
-        return {"status": "ok", "lesson_id": lesson_id}
+    course_ref = db.collection("users").document(uid) \
+                   .collection("courses").document(course_id)
+
+    try:
+        if current_app.config['OUTLINE_STREAMING']:
+            # persist and dispatch each module while the rest of the outline is still streaming
+            total_lessons = 0
+            task_ids = []       # published lesson tasks
+            undispatched = set()  # (module id, lesson id) written as pending but not published yet
+            researching = {}    # research future -> the module's lesson signatures
+            videos = []         # resolved together once the whole outline is known
+            modules = 0
+
+            def publish(signatures):
+                group(signatures).apply_async()
+                task_ids.extend(sig.id for sig in signatures)
+                undispatched.difference_update((sig.kwargs["module_id"], sig.kwargs["lesson_id"]) for sig in signatures)
+
+            try:
+                for mi, mod in enumerate(_stream_outline_modules(llm, messages), start=1):
+                    raise_if_cancelled(uid, course_id)
+                    mod.lessons = [lesson for lesson in mod.lessons if lesson.type in allowed]
+                    modules = mi
+                    deferred = bool(eager_modules) and mi > eager_modules
+
+                    # one commit per module, then one bulk publish for its lessons
+                    batch = db.batch()
+                    batch.update(course_ref, {
+                        "status": "generating",
+                        "totalLessons": Increment(len(mod.lessons)),
+                        "releasedLessons": Increment(0 if deferred else len(mod.lessons)),
+                    })
+                    signatures, module_videos = _write_module(batch, uid, course_id, topic, str(mi), mod, use_cache, deferred)
+                    batch.commit()
+                    if deferred:
+                        continue
+                    total_lessons += len(mod.lessons)
+                    undispatched.update((str(mi), sig.kwargs["lesson_id"]) for sig in signatures)
+                    undispatched.update((video["module_id"], video["lesson_id"]) for video in module_videos)
+                    videos.extend(module_videos)
+                    _register_signatures(uid, course_id, signatures)
+                    research = _start_research(uid, course_id, topic, str(mi), mod)
+                    if research:
+                        researching[research] = signatures
+                    elif signatures:
+                        publish(signatures)
+
+                    # release the modules whose research finished meanwhile
+                    for research in [f for f in researching if f.done()]:
+                        publish(researching.pop(research))
+
+                if modules < num_modules:
+                    raise ValueError(f"Outline has {modules} of {num_modules} modules")
+
+                released = min(eager_modules or modules, modules)
+                course_ref.update({
+                    "totalModules": modules,
+                    "releasedModules": [str(mi) for mi in range(1, released + 1)],
+                })
+
+                video_signature = _video_signature(uid, course_id, videos, use_cache)
+                if video_signature:
+                    _register_signatures(uid, course_id, [video_signature])
+                    video_signature.apply_async()
+                    task_ids.append(video_signature.id)
+                    undispatched.difference_update((video["module_id"], video["lesson_id"]) for video in videos)
+
+                for research in wait(researching).done:
+                    raise_if_cancelled(uid, course_id)
+                    publish(researching.pop(research))
+            except GenerationCancelled:
+                raise
+            except Exception as e:
+                if not task_ids:
+                    raise
+                # lessons are already generating: keep the modules outlined so far, fail the
+                # lessons that never went out (regenerate_failed_lessons retries them)
+                current_app.logger.exception(f"Outline of course {course_id} failed after {modules} module(s)")
+                _record_generation_error(uid, course_id, e)
+                released = min(eager_modules or modules, modules)
+                batch = db.batch()
+                batch.update(course_ref, {
+                    "totalModules": modules,
+                    "releasedModules": [str(mi) for mi in range(1, released + 1)],
+                    "outlineError": str(e),  # so finalize_course can't settle it as ready
+                })
+                for module_id, lesson_id in undispatched:
+                    batch.update(course_ref.collection("modules").document(module_id)
+                                           .collection("lessons").document(lesson_id),
+                                 {"status": "failed", "error": str(e)})
+                batch.commit()
+
+            # the header was only known piece by piece, so join on the dispatched ids
+            await_course_lessons.apply_async(
+                kwargs={"task_ids": task_ids, "uid": uid, "course_id": course_id},
+                countdown=current_app.config['AWAIT_LESSONS_INTERVAL'],
+            )
+        else:
+            resp = llm.with_structured_output(CourseOutline, method="json_schema").invoke(messages)
+            outline: CourseOutline = CourseOutline.model_validate(resp)
+
+            for mod in outline.modules:
+                mod.lessons = [lesson for lesson in mod.lessons if lesson.type in allowed]
+
+            # compute total lessons and move on to content generation
+            modules = len(outline.modules)
+            released = min(eager_modules or modules, modules)
+            total_lessons = sum(len(mod.lessons) for mod in outline.modules[:released])
+
+            # persist the whole outline in a single commit (8x8 lessons stays well under 500 writes)
+            batch = db.batch()
+            batch.update(course_ref, {
+                "status": "generating",
+                "totalLessons": sum(len(mod.lessons) for mod in outline.modules),
+                "releasedLessons": total_lessons,
+                "totalModules": modules,
+                "releasedModules": [str(mi) for mi in range(1, released + 1)],
+            })
+            signatures, videos = [], []
+            research = []
+            for mi, mod in enumerate(outline.modules, start=1):
+                if mi > released:
+                    _write_module(batch, uid, course_id, topic, str(mi), mod, use_cache, deferred=True)
+                    continue
+                module_signatures, module_videos = _write_module(batch, uid, course_id, topic, str(mi), mod, use_cache)
+                signatures.extend(module_signatures)
+                videos.extend(module_videos)
+                research.append(_start_research(uid, course_id, topic, str(mi), mod))
+            if videos:
+                signatures.append(_video_signature(uid, course_id, videos, use_cache))
+            raise_if_cancelled(uid, course_id)
+            batch.commit()
+            # all modules research concurrently; lessons start once every corpus is ready
+            wait([f for f in research if f])
+            raise_if_cancelled(uid, course_id)
+            _register_signatures(uid, course_id, signatures)
+
+            # enqueue lesson tasks over a single producer connection, finalizing once all are done
+            callback = finalize_course.s(uid=uid, course_id=course_id)
+            callback.on_error(mark_course_failed.s(uid=uid, course_id=course_id))
+            chord(group(signatures))(callback)
+
+        return {"status": "ok", "course_id": course_id, "total_lessons": total_lessons}
+    except GenerationCancelled:
+        return {"status": "cancelled", "course_id": course_id}
     except Exception as e:
-        db.collection('users').document(uid) \
-          .collection('generation_errors').document(course_id) \
-          .set({'error': str(e), 'failedAt': datetime.now(timezone.utc).isoformat()})
-        _delete_course(uid, course_id)
+        _record_generation_error(uid, course_id, e)
+        course_ref.update({"status": "failed", "error": str(e)})
         raise
+
+
+def _lesson_status_counts(course_ref) -> Counter:
+    """
+    Number of the course's lessons in each status, read from the lesson docs.
+    """
+    counts = Counter()
+    for module_snap in course_ref.collection("modules").stream():
+        for lesson_snap in module_snap.reference.collection("lessons").select(["status"]).stream():
+            counts[lesson_snap.get("status")] += 1
+    return counts
+
+@celery.task(name="finalize_course")
+def finalize_course(results: list, uid: str, course_id: str, started_at: str = None):
+    """
+    Chord callback: runs once after every lesson task of a generation pass has finished.
+    The course is settled from its lessons' statuses, so a pass that finishes while another
+    (a release or a regeneration) still has lessons pending leaves the status to that pass.
+    Lessons that exhausted their retries leave the course 'failed' so they can be regenerated.
+    `started_at` times a later pass; the first one is timed from the course's createdAt.
+    """
+    if is_cancelled(uid, course_id):
+        return {"status": "cancelled", "course_id": course_id}
+
+    # resolve_course_videos reports one result per video lesson
+    results = [r for result in results for r in (result if isinstance(result, list) else [result])]
+
+    course_ref = db.collection("users").document(uid) \
+                   .collection("courses").document(course_id)
+    course = course_ref.get().to_dict() or {}
+
+    started = started_at or course.get("createdAt")
+    started = datetime.fromisoformat(started) if started else None
+    now = datetime.now(timezone.utc)
+    seconds = (now - started).total_seconds() if started else None
+
+    counts = _lesson_status_counts(course_ref)
+    failed = counts["failed"]
+    outline_error = course.get("outlineError")
+    update = {
+        **read_counters(course_ref),
+        "failedLessons": failed,
+        "error": outline_error or (f"{failed} lesson(s) failed to generate" if failed else None),
+        ("passSeconds" if started_at else "generationSeconds"): seconds,
+    }
+    if counts["pending"] or counts["generating"]:
+        status = course.get("status")
+    else:
+        # a course whose outline was cut off is missing modules, whatever its lessons say
+        status = "failed" if failed or outline_error else "ready"
+        update.update({"status": status, "readyAt": now.isoformat()})
+
+    course_ref.update(update)
+    current_app.logger.info(f"Course {course_id} {status}: pass of {len(results)} lessons in {seconds}s, {failed} failed overall")
+    return {"status": status, "course_id": course_id, "lessons": len(results), "failed": failed, "seconds": seconds}
+
+@celery.task(name="mark_course_failed")
+def mark_course_failed(request, exc, traceback, uid: str, course_id: str, task_kwargs: list[dict] = None):
+    """
+    Chord errback: a lesson task failed, so the course will never be finalized. The task
+    crashed outside _retry_or_fail, so its lessons are marked failed here (from the request's
+    kwargs, or `task_kwargs` when await_course_lessons calls this without a request) and
+    regenerate_failed_lessons can pick them up instead of them staying 'generating'.
+    """
+    if is_cancelled(uid, course_id):
+        return
+    course_ref = db.collection("users").document(uid) \
+                   .collection("courses").document(course_id)
+    if not course_ref.get().exists:
+        return
+    if request is not None:
+        task_kwargs = [request.kwargs or {}]
+
+    batch = db.batch()
+    for kwargs in task_kwargs or []:
+        # resolve_course_videos carries its lessons as a list
+        for lesson in kwargs.get("lessons") or ([kwargs] if "lesson_id" in kwargs else []):
+            batch.update(course_ref.collection("modules").document(lesson["module_id"])
+                                   .collection("lessons").document(lesson["lesson_id"]),
+                         {"status": "failed", "error": str(exc)})
+    batch.update(course_ref, {"status": "failed", "error": str(exc)})
+    batch.commit()
+
+@celery.task(bind=True, name="await_course_lessons", max_retries=None)
+def await_course_lessons(self, task_ids: list[str], uid: str, course_id: str):
+    """
+    Chord-style join for lesson tasks that were dispatched module by module
+    while the outline was streaming.
+    """
+    if is_cancelled(uid, course_id):
+        return {"status": "cancelled", "course_id": course_id}
+
+    results = GroupResult(results=[celery.AsyncResult(task_id) for task_id in task_ids])
+    if not results.ready():
+        raise self.retry(countdown=current_app.config['AWAIT_LESSONS_INTERVAL'])
+
+    if not results.successful():
+        # revoked tasks are ready but neither successful nor failed
+        unsuccessful = [r for r in results.results if not r.successful()]
+        failed = next((r for r in unsuccessful if r.failed()), None)
+        exc = failed.result if failed else RuntimeError("a lesson task was revoked")
+        return mark_course_failed(None, exc, None, uid=uid, course_id=course_id,
+                                  task_kwargs=[r.kwargs for r in unsuccessful if r.kwargs])
+    return finalize_course([r.result for r in results.results], uid=uid, course_id=course_id)
+
+@celery.task(bind=True, name="regenerate_failed_lessons")
+def regenerate_failed_lessons(self, uid: str, course_id: str):
+    """
+    Re-enqueue only the lessons whose generation failed or was cancelled and finalize
+    the course again afterwards.
+    """
+    course_ref = db.collection("users").document(uid) \
+                   .collection("courses").document(course_id)
+    course = course_ref.get().to_dict() or {}
+    topic = course.get("topic")
+    use_cache = course.get("generationCache", True)
+    clear_cancelled(uid, course_id)
+
+    statuses = ["failed", "cancelled"]
+    if course.get("status") == "cancelled":
+        # tasks revoked before they started never got to update their lesson
+        statuses += ["pending", "generating"]
+
+    # lessons left deferred in a module released before release_modules claimed atomically
+    released = set(course.get("releasedModules", [])) if course.get("lazyGeneration") else set()
+
+    batch = db.batch()
+    signatures, videos = [], []
+    for module_snap in course_ref.collection("modules").stream():
+        module_statuses = statuses + ["deferred"] if module_snap.id in released else statuses
+        failed_lessons = module_snap.reference.collection("lessons") \
+                                    .where(filter=FieldFilter("status", "in", module_statuses)) \
+                                    .stream()
+        for lesson_snap in failed_lessons:
+            lesson = LessonOutline.model_validate(lesson_snap.to_dict())
+            batch.update(lesson_snap.reference, {"status": "pending", "error": None})
+            if lesson.type == "video":
+                videos.append(_video_lesson(module_snap.id, module_snap.get("title"), lesson_snap.id, lesson))
+                continue
+            signatures.append(_lesson_signature(
+                uid, course_id, topic, module_snap.id, module_snap.get("title"), lesson_snap.id, lesson, use_cache
+            ))
+    if videos:
+        signatures.append(_video_signature(uid, course_id, videos, use_cache))
+
+    if not signatures:
+        return {"status": "ok", "course_id": course_id, "lessons": 0}
+
+    started_at = datetime.now(timezone.utc).isoformat()
+    batch.update(course_ref, {"status": "generating", "error": None})
+    batch.commit()
+    _register_signatures(uid, course_id, signatures)
+
+    callback = finalize_course.s(uid=uid, course_id=course_id, started_at=started_at)
+    callback.on_error(mark_course_failed.s(uid=uid, course_id=course_id))
+    chord(group(signatures))(callback)
+    return {"status": "ok", "course_id": course_id, "lessons": len(signatures)}
+
+def unreleased_window(course: dict, module_id: str) -> list[str]:
+    """
+    For a lazy course: the module a learner is in plus the next LAZY_LOOKAHEAD_MODULES,
+    in order, if any of them hasn't been released yet. Otherwise (and for eager courses) [].
+    """
+    if not course.get("lazyGeneration") or not course.get("totalModules"):
+        return []
+    first = int(module_id)
+    last = min(first + Config.LAZY_LOOKAHEAD_MODULES, course["totalModules"])
+    window = [str(mi) for mi in range(first, last + 1)]
+    if set(window) <= set(course.get("releasedModules", [])):
+        return []
+    return window
+
+def release_upcoming_modules(uid: str, course_id: str, course: dict, module_id: str):
+    """
+    Called when a learner opens or completes a lesson: queue the modules around
+    `module_id` that haven't been generated yet. Just a dict check when there are none.
+    """
+    window = unreleased_window(course, module_id)
+    if not window:
+        return
+    task = release_modules.signature(
+        kwargs={"uid": uid, "course_id": course_id, "module_ids": window},
+        priority=0,
+    )
+    _register_signatures(uid, course_id, [task])
+    task.apply_async()
+
+@transactional
+def _claim_modules(transaction, course_ref, module_ids: list[str]):
+    """
+    Mark the not yet released modules of `module_ids` as released and flip their deferred
+    lessons to pending in the same transaction, so a crash can't leave a released module
+    whose lessons stay deferred. Concurrent triggers for the same window therefore release
+    each module once. Returns the course and, per claimed module, its title and lesson snapshots.
+    """
+    course = course_ref.get(transaction=transaction).to_dict() or {}
+    released = set(course.get("releasedModules", []))
+    claimed = []
+    for mid in module_ids:
+        if mid in released:
+            continue
+        module_ref = course_ref.collection("modules").document(mid)
+        lessons = module_ref.collection("lessons") \
+                            .where(filter=FieldFilter("status", "==", "deferred")) \
+                            .stream(transaction=transaction)
+        claimed.append((mid, module_ref.get(transaction=transaction).get("title"), list(lessons)))
+    if claimed:
+        transaction.update(course_ref, {
+            "releasedModules": sorted(released | {mid for mid, _, _ in claimed}, key=int),
+            "releasedLessons": Increment(sum(len(lessons) for _, _, lessons in claimed)),
+        })
+        for _, _, lessons in claimed:
+            for lesson_snap in lessons:
+                transaction.update(lesson_snap.reference, {"status": "pending"})
+    return claimed, course
+
+@celery.task(name="release_modules")
+def release_modules(uid: str, course_id: str, module_ids: list[str]):
+    """
+    Generate the deferred lessons of a lazy course's `module_ids` (the learner's current
+    module first) and finalize the course again afterwards.
+    """
+    if is_cancelled(uid, course_id):
+        return {"status": "cancelled", "course_id": course_id}
+
+    course_ref = db.collection("users").document(uid) \
+                   .collection("courses").document(course_id)
+    claimed, course = _claim_modules(db.transaction(), course_ref, module_ids)
+    if not claimed:
+        return {"status": "ok", "course_id": course_id, "lessons": 0}
+    topic = course.get("topic")
+    use_cache = course.get("generationCache", True)
+
+    signatures, videos, research = [], [], []
+    total_lessons = 0
+    for mid, module_title, lesson_snaps in claimed:
+        lessons = []
+        for lesson_snap in lesson_snaps:
+            lesson = LessonOutline.model_validate(lesson_snap.to_dict())
+            lessons.append(lesson)
+            if lesson.type == "video":
+                videos.append(_video_lesson(mid, module_title, lesson_snap.id, lesson))
+                continue
+            # schedule relative to the learner: their current module goes first
+            position = str(module_ids.index(mid) + 1)
+            signatures.append(_lesson_signature(
+                uid, course_id, topic, mid, module_title, lesson_snap.id, lesson, use_cache,
+                priority=_lesson_priority(position, lesson_snap.id),
+            ))
+        total_lessons += len(lessons)
+        research.append(_start_research(uid, course_id, topic, mid, ModuleOutline(title=module_title, lessons=lessons)))
+    if videos:
+        signatures.append(_video_signature(uid, course_id, videos, use_cache))
+
+    if not signatures:
+        return {"status": "ok", "course_id": course_id, "lessons": 0}
+
+    # the course keeps its status (a learner may be studying it), finalize_course settles it
+    started_at = datetime.now(timezone.utc).isoformat()
+    wait([f for f in research if f])
+    if is_cancelled(uid, course_id):
+        return {"status": "cancelled", "course_id": course_id}
+    _register_signatures(uid, course_id, signatures)
+
+    callback = finalize_course.s(uid=uid, course_id=course_id, started_at=started_at)
+    callback.on_error(mark_course_failed.s(uid=uid, course_id=course_id))
+    chord(group(signatures))(callback)
+    return {"status": "ok", "course_id": course_id, "modules": [mid for mid, _, _ in claimed], "lessons": total_lessons}
@@ -0,0 +1,241 @@
+import hashlib
+import json
+import re
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+import backoff
+import httplib2
+import redis
+from celery.signals import worker_process_init
+from googleapiclient.discovery import build_from_document
+from googleapiclient.errors import HttpError
+from back_end.config import Config
+from back_end.extensions.redis import redis_client
+
+# YouTube Data API quota units per call; the daily quota resets at midnight Pacific time
+SEARCH_COST = 100
+VIDEOS_LIST_COST = 1
+STATS_BATCH_SIZE = 50   # videos.list accepts up to 50 ids
+
+
+# Trimmed YouTube Data API v3 discovery document (search.list and videos.list only),
+# so building the client neither fetches nor parses the full ~370 KB document.
+_DISCOVERY_DOCUMENT = (Path(__file__).parent / "youtube_discovery.json").read_text()
+
+_services = {}
+_local = threading.local()
+
+def _http() -> httplib2.Http:
+    """
+    httplib2.Http is not thread-safe, so every thread keeps its own keep-alive transport.
+    """
+    http = getattr(_local, "http", None)
+    if http is None:
+        http = _local.http = httplib2.Http(timeout=Config.HTTP_TIMEOUT)
+    return http
+
+def get_youtube(api_key: str):
+    """
+    The YouTube client for `api_key`, built once per process. The resource is
+    shared between threads; execute its requests with `http=_http()`.
+    """
+    service = _services.get(api_key)
+    if service is None:
+        service = _services[api_key] = build_from_document(
+            _DISCOVERY_DOCUMENT, developerKey=api_key, http=_http()
+        )
+    return service
+
+@worker_process_init.connect
+def reset_youtube_clients(**kwargs):
+    # don't reuse sockets inherited from the parent across the prefork
+    global _local
+    _services.clear()
+    _local = threading.local()
+
+
+class QuotaExceeded(Exception):
+    """
+    The call would take today's YouTube quota over YOUTUBE_DAILY_QUOTA.
+    """
+
+
+def _quota_key() -> str:
+    return f"youtube:quota:{datetime.now(ZoneInfo('America/Los_Angeles')).date().isoformat()}"
+
+def reserve_quota(units: int):
+    """
+    Count `units` against today's quota before making a call, or raise QuotaExceeded.
+    Without Redis the call goes ahead uncounted; the API still enforces the real quota.
+    """
+    key = _quota_key()
+    try:
+        pipe = redis_client.pipeline()
+        pipe.incrby(key, units)
+        pipe.expire(key, 60 * 60 * 48)
+        used = pipe.execute()[0]
+    except redis.RedisError:
+        return
+    if used > Config.YOUTUBE_DAILY_QUOTA:
+        try:
+            redis_client.decrby(key, units)
+        except redis.RedisError:
+            pass
+        raise QuotaExceeded(f"YouTube quota exhausted ({used - units}/{Config.YOUTUBE_DAILY_QUOTA} units used today)")
+
+def quota_used() -> Optional[int]:
+    """
+    Units counted against today's quota, or None if Redis is unavailable.
+    """
+    try:
+        return int(redis_client.get(_quota_key()) or 0)
+    except redis.RedisError:
+        return None
+
+
+@backoff.on_exception(backoff.expo, HttpError, max_tries=3, factor=2)
+def search_youtube_videos(
+    query: str,
+    api_key: str,
+    max_results: int = 10,
+    video_duration: str = "medium",
+) -> List[Dict]:
+    youtube = get_youtube(api_key)
+    all_items = []
+    seen_ids = set()
+
+    # 1) build params dict
+    params = {
+        "part": "snippet",
+        "q": query,
+        "type": "video",
+        "videoEmbeddable": "true",
+        "maxResults": max_results,
+        "order": "viewCount",
+        "videoDuration": video_duration,
+    }
+
+    # 2) execute the search with those params
+    reserve_quota(SEARCH_COST)
+    resp = youtube.search().list(**params).execute(http=_http())
+    for item in resp.get("items", []):
+        vid = item["id"]["videoId"]
+        if vid not in seen_ids:
+            seen_ids.add(vid)
+            all_items.append(item)
+
+    return all_items
+
+@backoff.on_exception(backoff.expo, HttpError, max_tries=3, factor=2)
+def fetch_video_stats(api_key: str, video_ids: List[str]) -> Dict[str, Dict]:
+    """
+    Returns a mapping videoId -> { viewCount: int, likeCount: int, ... }
+    """
+    youtube = get_youtube(api_key)
+    reserve_quota(VIDEOS_LIST_COST)
+    resp = youtube.videos().list(
+        part="statistics",
+        id=",".join(video_ids),
+        maxResults=len(video_ids)
+    ).execute(http=_http())
+    stats = {}
+    for item in resp.get("items", []):
+        stats[item["id"]] = {
+            "viewCount": int(item["statistics"].get("viewCount", 0)),
+            "likeCount": int(item["statistics"].get("likeCount", 0)),
+        }
+    return stats
+
+def score_video(snippet: Dict, stat: Dict) -> float:
+    """
+    Simple score combining recency and popularity:
+      - More recent → higher score
+      - More views → higher score
+    """
+    # recency factor: days since published, capped at 30 days
+    published_at = datetime.fromisoformat(snippet["publishedAt"].replace("Z", "+00:00"))
+    age_days = (datetime.now(timezone.utc) - published_at).days
+    recency_score = max(0, 365*5 - age_days)  # 0–5 years, then clamps at 0
+
+    view_score = stat["viewCount"] / 1000.0  # 1 point per 1,000 views
+    return recency_score * 1 + view_score * 1.2
+
+
+def _search_key(query: str) -> str:
+    normalized = re.sub(r"\s+", " ", query).strip().lower()
+    return f"youtube:search:{hashlib.sha256(normalized.encode('utf-8')).hexdigest()}"
+
+def _cached_search(api_key: str, query: str, use_cache: bool) -> List[Dict]:
+    key = _search_key(query)
+    if use_cache:
+        try:
+            cached = redis_client.get(key)
+        except redis.RedisError:
+            cached = None
+        if cached:
+            return json.loads(cached)
+
+    videos = search_youtube_videos(query=query, api_key=api_key, max_results=10, video_duration="medium")
+    try:
+        redis_client.set(key, json.dumps(videos), ex=Config.YOUTUBE_SEARCH_TTL)
+    except redis.RedisError:
+        pass
+    return videos
+
+def _cached_stats(api_key: str, video_ids: List[str]) -> Dict[str, Dict]:
+    """
+    Stats for all `video_ids`: cached ones from Redis, the rest in 50-id videos.list calls.
+    """
+    stats = {}
+    try:
+        cached = redis_client.mget([f"youtube:stats:{vid}" for vid in video_ids])
+    except redis.RedisError:
+        cached = [None] * len(video_ids)
+    for vid, value in zip(video_ids, cached):
+        if value:
+            stats[vid] = json.loads(value)
+
+    missing = [vid for vid in video_ids if vid not in stats]
+    for i in range(0, len(missing), STATS_BATCH_SIZE):
+        fetched = fetch_video_stats(api_key, missing[i:i + STATS_BATCH_SIZE])
+        stats.update(fetched)
+        try:
+            pipe = redis_client.pipeline()
+            for vid, stat in fetched.items():
+                pipe.set(f"youtube:stats:{vid}", json.dumps(stat), ex=Config.YOUTUBE_STATS_TTL)
+            pipe.execute()
+        except redis.RedisError:
+            pass
+    return stats
+
+def resolve_videos(api_key: str, queries: List[str], use_cache: bool = True) -> Dict[str, Dict]:
+    """
+    Pick the best video for every query at once: each distinct query is searched
+    once (or served from cache) and all candidates' statistics are fetched together.
+    Returns query -> lesson video content; queries without results are left out.
+    """
+    candidates = {query: _cached_search(api_key, query, use_cache) for query in dict.fromkeys(queries)}
+    video_ids = list(dict.fromkeys(v["id"]["videoId"] for videos in candidates.values() for v in videos))
+    stats_map = _cached_stats(api_key, video_ids) if video_ids else {}
+
+    resolved = {}
+    for query, videos in candidates.items():
+        if not videos:
+            continue
+        best = max(
+            videos,
+            key=lambda v: score_video(v["snippet"], stats_map.get(v["id"]["videoId"], {"viewCount":0}))
+        )
+        vid_id = best["id"]["videoId"]
+        snip  = best["snippet"]
+        resolved[query] = {
+            "videoId":    vid_id,
+            "title":      snip["title"],
+            "description": snip["description"],
+            "thumbnail":  snip["thumbnails"]["high"]["url"],
+            "url":        f"https://www.youtube.com/watch?v={vid_id}",
+        }
+    return resolved
@@ -0,0 +1,54 @@
+# back_end/utils/auth.py
+
+import hashlib
+import time
+from functools import wraps
+from flask import request, jsonify, current_app, g
+from firebase_admin import auth as firebase_auth
+from back_end.config import Config
+from back_end.utils.cache import TTLLRUCache
+
+# decoded ID tokens keyed by sha256(token); never the raw token
+token_cache = TTLLRUCache(maxsize=Config.AUTH_CACHE_SIZE, ttl=Config.AUTH_CACHE_TTL)
+
+def verify_token(id_token: str) -> dict:
+    """
+    Verify a Firebase ID token, reusing a previous successful verification while it is fresh.
+
+    Entries never outlive the token's own `exp`. Only successful verifications
+    are cached, so a token signed with a newly rotated key is simply a miss and
+    goes through firebase_admin, which refreshes Google's public certificates
+    according to their Cache-Control headers.
+    """
+    key = hashlib.sha256(id_token.encode('utf-8')).hexdigest()
+    decoded = token_cache.get(key)
+    if decoded is not None and decoded['exp'] > time.time():
+        return decoded
+
+    decoded = firebase_auth.verify_id_token(id_token)
+    remaining = decoded['exp'] - time.time()
+    if remaining > 0:
+        token_cache.set(key, decoded, ttl=remaining)
+    return decoded
+
+def require_auth(view):
+    """
+    Reject requests without a valid `Authorization: Bearer <id token>` header
+    and expose the caller's uid as `g.uid`.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        auth_header = request.headers.get('Authorization', '')
+        if not auth_header.startswith('Bearer '):
+            return jsonify(error='Missing or malformed Authorization header'), 401
+
+        try:
+            decoded = verify_token(auth_header.split('Bearer ')[1])
+        except Exception as e:
+            current_app.logger.warning(f'Token verification failed: {e!r}')
+            return jsonify(error='Invalid auth token'), 401
+
+        g.uid = decoded['uid']
+        return view(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,57 @@
+# back_end/utils/cache.py
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLLRUCache:
+    """
+    Small thread-safe in-process LRU where every entry also expires after a TTL.
+    Keeps hit/miss counters so callers can expose them as metrics.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self._data.pop(key, None)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl: float = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / total if total else 0.0,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+        }
@@ -0,0 +1,101 @@
+# back_end/utils/chat_sessions.py
+
+import json
+import re
+from back_end.config import Config
+from back_end.extensions.redis import redis_client
+from back_end.utils.tokens import count_tokens
+
+SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+# Per session, in Redis:
+#   chat:{uid}:{sid}:turns        list of {"from", "text"} not yet folded into the summary
+#   chat:{uid}:{sid}:summary      rolling summary of every turn trimmed from the list
+#   chat:{uid}:{sid}:summarizing  NX lock (holding the task's token) while a summary task is pending
+
+# Only apply a summary if nothing changed underneath it: the summary it extended is still
+# the current one and the turns it folded are still the oldest ones. Otherwise another
+# summary task got there first and this one is dropped.
+_STORE_SUMMARY = """
+local summary_key, turns_key = KEYS[1], KEYS[2]
+local previous, summary, ttl = ARGV[1], ARGV[2], tonumber(ARGV[3])
+if (redis.call('GET', summary_key) or '') ~= previous then return 0 end
+local folded = #ARGV - 3
+local head = redis.call('LRANGE', turns_key, 0, folded - 1)
+if #head ~= folded then return 0 end
+for i = 1, folded do
+  if head[i] ~= ARGV[i + 3] then return 0 end
+end
+redis.call('SET', summary_key, summary, 'EX', ttl)
+redis.call('LTRIM', turns_key, folded, -1)
+return 1
+"""
+
+_RELEASE_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+return 0
+"""
+
+_store_summary = redis_client.register_script(_STORE_SUMMARY)
+_release_lock = redis_client.register_script(_RELEASE_LOCK)
+
+def session_key(uid: str, session_id: str, part: str) -> str:
+    return f"chat:{uid}:{session_id}:{part}"
+
+def load_session(uid: str, session_id: str) -> tuple[str, list[dict]]:
+    """
+    The rolling summary ('' if none yet) and the unsummarized turns, oldest first.
+    """
+    pipe = redis_client.pipeline()
+    pipe.get(session_key(uid, session_id, "summary"))
+    pipe.lrange(session_key(uid, session_id, "turns"), 0, -1)
+    summary, turns = pipe.execute()
+    return (summary or b"").decode("utf-8"), [json.loads(t) for t in turns]
+
+def _encode_turn(turn: dict) -> str:
+    return json.dumps({"from": turn.get("from"), "text": turn.get("text")})
+
+def append_turn(uid: str, session_id: str, sender: str, text: str):
+    """
+    Append one turn and refresh the session TTL.
+    """
+    turns_key = session_key(uid, session_id, "turns")
+    summary_key = session_key(uid, session_id, "summary")
+    pipe = redis_client.pipeline()
+    pipe.rpush(turns_key, _encode_turn({"from": sender, "text": text}))
+    pipe.expire(turns_key, Config.CHAT_SESSION_TTL)
+    pipe.expire(summary_key, Config.CHAT_SESSION_TTL)
+    pipe.execute()
+
+def store_summary(uid: str, session_id: str, previous: str, summary: str, folded: list[dict]) -> bool:
+    """
+    Replace the rolling summary `previous` with `summary` and drop the `folded` turns it now
+    covers, atomically and only if neither changed since they were loaded. Returns whether it did.
+    New turns are only ever appended on the right, so trimming from the left is safe.
+    """
+    keys = [session_key(uid, session_id, "summary"), session_key(uid, session_id, "turns")]
+    args = [previous, summary, Config.CHAT_SESSION_TTL, *(_encode_turn(t) for t in folded)]
+    return bool(_store_summary(keys=keys, args=args))
+
+def release_summary_lock(uid: str, session_id: str, token: str):
+    """
+    Drop the summary lock, unless it expired and another task holds it by now.
+    """
+    _release_lock(keys=[session_key(uid, session_id, "summarizing")], args=[token])
+
+def clear_session(uid: str, session_id: str):
+    redis_client.delete(*(session_key(uid, session_id, part) for part in ("turns", "summary", "summarizing")))
+
+def window_turns(turns: list[dict], budget: int = Config.CHAT_WINDOW_TOKENS) -> tuple[list[dict], int]:
+    """
+    Newest turns that fit in `budget` tokens (the latest one is always kept).
+    Returns (window, older) where `older` is how many leading turns fell outside it.
+    """
+    used, start = 0, len(turns)
+    while start > 0:
+        cost = count_tokens(turns[start - 1].get("text", ""))
+        if start < len(turns) and used + cost > budget:
+            break
+        used += cost
+        start -= 1
+    return turns[start:], start
@@ -0,0 +1,92 @@
+# back_end/utils/context_compression.py
+
+import re
+import zlib
+import numpy as np
+from back_end.config import Config
+from back_end.utils.embeddings import chunk_text, get_embedder
+from back_end.utils.tokens import count_tokens
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(7)
+_A = _rng.integers(1, _PRIME, size=Config.SEARCH_MINHASH_PERMUTATIONS, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, size=Config.SEARCH_MINHASH_PERMUTATIONS, dtype=np.uint64)
+_WORD_RE = re.compile(r"\w+")
+
+
+def _minhash(text: str, shingle: int = 5) -> np.ndarray:
+    """
+    MinHash signature of the word `shingle`-grams of `text`.
+    """
+    words = _WORD_RE.findall(text.lower())
+    grams = {" ".join(words[i:i + shingle]) for i in range(max(len(words) - shingle + 1, 1))}
+    hashes = np.array([zlib.crc32(g.encode("utf-8")) for g in grams], dtype=np.uint64)
+    return ((np.outer(hashes, _A) + _B) % _PRIME).min(axis=0)
+
+def _passages(results: list[dict]) -> list[dict]:
+    """
+    Split search results into passages that remember their source.
+    Very short fragments (navigation, captions, cookie banners) are dropped.
+    """
+    passages = []
+    for source, res in enumerate(results):
+        for text in chunk_text(res.get("content") or "", Config.SEARCH_PASSAGE_WORDS):
+            if len(text.split()) >= Config.SEARCH_MIN_PASSAGE_WORDS:
+                passages.append({"source": source, "text": text})
+    return passages
+
+def _dedupe(passages: list[dict]) -> list[dict]:
+    """
+    Drop passages whose estimated Jaccard similarity to an earlier one is above the threshold.
+    """
+    kept, signatures = [], []
+    for passage in passages:
+        signature = _minhash(passage["text"])
+        if any(np.mean(signature == other) >= Config.SEARCH_DEDUP_THRESHOLD for other in signatures):
+            continue
+        kept.append(passage)
+        signatures.append(signature)
+    return kept
+
+def compress_results(results: list[dict], query: str, focus: str = None, budget: int = Config.SEARCH_CONTEXT_TOKENS):
+    """
+    Shrink search results to the passages most relevant to `query` (and the lesson
+    `focus`) that fit in `budget` tokens, after near-duplicate removal.
+
+    Returns (context text, indices of the results that contributed, raw tokens, kept tokens).
+    """
+    raw_tokens = sum(count_tokens(f"{r.get('title', '')}\n{r.get('content', '')}") for r in results)
+    passages = _dedupe(_passages(results))
+    if not passages:
+        return "", [], raw_tokens, 0
+
+    embedder = get_embedder()
+    matrix = embedder.embed([p["text"] for p in passages])
+    targets = embedder.embed([query, focus or query])
+    scores = (matrix @ targets.T).mean(axis=1)
+
+    # passages far less relevant than the best one are left out even if they would fit,
+    # but the best passage that fits is always kept (scores can all be <= 0)
+    floor = max(scores.max(), 0) * Config.SEARCH_MIN_RELATIVE_SCORE
+    chosen, used = [], 0
+    for i in np.argsort(-scores):
+        if chosen and scores[i] < floor:
+            break
+        cost = count_tokens(passages[i]["text"])
+        if used + cost > budget:
+            continue
+        chosen.append(i)
+        used += cost
+
+    # keep the chosen passages grouped by source and in reading order
+    chosen.sort(key=lambda i: (passages[i]["source"], i))
+    sources, blocks = [], []
+    for i in chosen:
+        source = passages[i]["source"]
+        if source not in sources:
+            sources.append(source)
+            blocks.append(f"{results[source].get('title', '')}\n{passages[i]['text']}")
+        else:
+            blocks[-1] += f"\n{passages[i]['text']}"
+    text = "\n\n".join(blocks)
+    return text, sources, raw_tokens, count_tokens(text)
@@ -0,0 +1,26 @@
+# back_end/utils/counters.py
+
+import random
+from google.cloud.firestore import Increment
+from back_end.config import Config
+
+def _shards_ref(course_ref):
+    return course_ref.collection('counter_shards')
+
+def increment_counter(course_ref, field: str, amount: int = 1):
+    """
+    Add `amount` to `field` on a random shard under /courses/{id}/counter_shards,
+    so concurrent writers don't queue up on the course document itself.
+    """
+    shard_id = str(random.randrange(Config.COUNTER_SHARDS))
+    _shards_ref(course_ref).document(shard_id).set({field: Increment(amount)}, merge=True)
+
+def read_counters(course_ref) -> dict:
+    """
+    Sum every shard into {field: total}.
+    """
+    totals = {}
+    for snap in _shards_ref(course_ref).stream():
+        for field, value in (snap.to_dict() or {}).items():
+            totals[field] = totals.get(field, 0) + value
+    return totals
@@ -0,0 +1,128 @@
+# back_end/utils/embeddings.py
+
+import base64
+import re
+import zlib
+import numpy as np
+from flask import current_app
+from back_end.config import Config
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+class HashingEmbedder:
+    """
+    Dependency-free embedder: signed feature hashing of word unigrams and bigrams.
+    Deterministic across processes, so it is safe for tests and offline runs.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = _TOKEN_RE.findall(text.lower())
+            features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+            if not features:
+                continue
+            hashes = np.array([zlib.crc32(f.encode("utf-8")) for f in features], dtype=np.uint32)
+            signs = np.where(hashes & 1, 1.0, -1.0).astype(np.float32)
+            np.add.at(vectors[row], (hashes >> 1) % self.dim, signs)
+        return _normalize(vectors)
+
+
+class SentenceTransformerEmbedder:
+    """
+    Embeds with the sentence-transformers model named by Config.EMBEDDING_MODEL.
+    """
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = model_name
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = self.model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+        return vectors.astype(np.float32)
+
+
+_embedder = None
+
+def get_embedder():
+    """
+    The process-wide embedder, picked by Config.EMBEDDING_BACKEND ('sentence-transformers' or 'hashing').
+    Falls back to hashing when sentence-transformers isn't installed.
+    """
+    global _embedder
+    if _embedder is None:
+        if Config.EMBEDDING_BACKEND == "hashing":
+            _embedder = HashingEmbedder()
+        else:
+            try:
+                _embedder = SentenceTransformerEmbedder(Config.EMBEDDING_MODEL)
+            except ImportError:
+                current_app.logger.warning("sentence-transformers not installed, using the hashing embedder")
+                _embedder = HashingEmbedder()
+    return _embedder
+
+def set_embedder(embedder):
+    """
+    Swap the process-wide embedder (e.g. HashingEmbedder() in tests without network).
+    """
+    global _embedder
+    _embedder = embedder
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def chunk_text(text: str, chunk_words: int = Config.RAG_CHUNK_WORDS) -> list[str]:
+    """
+    Split markdown into chunks of roughly `chunk_words` words along paragraph
+    boundaries; paragraphs longer than that are cut on word boundaries.
+    """
+    chunks, current, size = [], [], 0
+    for paragraph in re.split(r"\n\s*\n", text):
+        words = paragraph.split()
+        if not words:
+            continue
+        if len(words) > chunk_words:
+            if current:
+                chunks.append("\n\n".join(current))
+                current, size = [], 0
+            for i in range(0, len(words), chunk_words):
+                chunks.append(" ".join(words[i:i + chunk_words]))
+            continue
+        if size + len(words) > chunk_words and current:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(paragraph.strip())
+        size += len(words)
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+def encode_matrix(vectors: np.ndarray) -> str:
+    """
+    float32 matrix -> compact base64 string (for Redis/JSON); Firestore stores the raw bytes.
+    """
+    return base64.b64encode(vectors.astype(np.float32).tobytes()).decode("ascii")
+
+def decode_matrix(data, dim: int) -> np.ndarray:
+    raw = base64.b64decode(data) if isinstance(data, str) else data
+    return np.frombuffer(raw, dtype=np.float32).reshape(-1, dim)
+
+def top_k(query: np.ndarray, matrix: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k rows most similar to `query` (cosine, rows are normalized), best first.
+    """
+    scores = matrix @ query
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.array([], dtype=np.int64)
+    best = np.argpartition(-scores, k - 1)[:k]
+    return best[np.argsort(-scores[best])]
@@ -1,10 +1,18 @@
 # back_end/utils/firestore.py
 
+import time
+from google.cloud.firestore_v1.bulk_writer import BulkWriterOptions
+from back_end.config import Config
 from back_end.extensions.firebase import db
 
-def _delete_course(uid: str, course_id: str):
+def _delete_course(uid: str, course_id: str, max_ops_per_second: int = Config.DELETE_MAX_OPS_PER_SECOND) -> dict:
     """
-    Delete /users/{uid}/courses/{course_id} and all nested modules & lessons.
+    Delete /users/{uid}/courses/{course_id} and every document below it
+    (modules, lessons, lesson content, counter shards and any other subcollection).
+
+    The subtree is discovered with collection-group style queries and deleted
+    through a BulkWriter, which sends batches in parallel up to
+    `max_ops_per_second`. Returns {"deleted", "failed", "seconds"}.
     """
     course_ref = (
         db.collection('users')
@@ -13,11 +21,26 @@ def _delete_course(uid: str, course_id: str):
           .document(course_id)
     )
 
-    # delete all modules & lessons
-    for mod_ref in course_ref.collection('modules').list_documents():
-        for lesson_ref in mod_ref.collection('lessons').list_documents():
-            lesson_ref.delete()
-        mod_ref.delete()
+    failed = []
+
+    def on_write_error(failure, bulk_writer) -> bool:
+        # retry a few times, then give up on that document
+        if failure.attempts < 3:
+            return True
+        failed.append(failure.operation.reference.path)
+        return False
+
+    bulk_writer = db.bulk_writer(BulkWriterOptions(
+        initial_ops_per_second=max_ops_per_second,
+        max_ops_per_second=max_ops_per_second,
+    ))
+    bulk_writer.on_write_error(on_write_error)
+
+    started = time.perf_counter()
+    deleted = db.recursive_delete(course_ref, bulk_writer=bulk_writer)
 
-    # delete the course document itself
-    course_ref.delete()
+    return {
+        "deleted": deleted - len(failed),
+        "failed": len(failed),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
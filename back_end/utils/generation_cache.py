@@ -0,0 +1,103 @@
+# back_end/utils/generation_cache.py
+
+import hashlib
+import json
+import re
+import time
+import redis
+from flask import current_app
+from back_end.config import Config
+from back_end.extensions.redis import redis_client
+
+# Bump a kind's version whenever its prompt changes, so stale entries are never served.
+PROMPT_VERSIONS = {
+    "reading": 1,
+    "test": 1,
+    "assignment": 1,
+}
+
+_LRU_KEY = "gencache:lru"      # sorted set: entry key -> last access time
+_STATS_KEY = "gencache:stats"  # hash: "{hits|misses}:{kind}" -> count
+
+def _normalize(value):
+    if isinstance(value, str):
+        # case, whitespace and trailing punctuation don't change what gets generated
+        return re.sub(r"\s+", " ", value).strip().strip(".!?:;").lower()
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+def generation_key(kind: str, model: str, **inputs) -> str:
+    """
+    Content address of a generation: kind, prompt version, model and normalized inputs.
+    """
+    material = json.dumps({
+        "kind": kind,
+        "version": PROMPT_VERSIONS[kind],
+        "model": model,
+        "inputs": {name: _normalize(value) for name, value in inputs.items()},
+    }, sort_keys=True)
+    return f"gencache:{kind}:{hashlib.sha256(material.encode('utf-8')).hexdigest()}"
+
+def _record(outcome: str, kind: str):
+    redis_client.hincrby(_STATS_KEY, f"{outcome}:{kind}", 1)
+
+def get_generation(key: str):
+    """
+    The cached content for `key`, or None. Redis failures count as a miss.
+    """
+    kind = key.split(":")[1]
+    try:
+        cached = redis_client.get(key)
+        if cached is None:
+            _record("misses", kind)
+            return None
+        pipe = redis_client.pipeline()
+        pipe.zadd(_LRU_KEY, {key: time.time()})
+        pipe.expire(key, Config.GENERATION_CACHE_TTL)
+        pipe.hincrby(_STATS_KEY, f"hits:{kind}", 1)
+        pipe.execute()
+        return json.loads(cached)
+    except redis.RedisError as e:
+        current_app.logger.warning(f'Generation cache unavailable: {e!r}')
+        return None
+
+def set_generation(key: str, content):
+    """
+    Store generated content; entries expire after GENERATION_CACHE_TTL and the least
+    recently used ones are evicted beyond GENERATION_CACHE_MAX_ENTRIES.
+    """
+    now = time.time()
+    try:
+        pipe = redis_client.pipeline()
+        pipe.set(key, json.dumps(content), ex=Config.GENERATION_CACHE_TTL)
+        pipe.zadd(_LRU_KEY, {key: now})
+        # every access refreshes the score and the key's TTL together, so members last
+        # touched more than a TTL ago belong to keys Redis has already expired
+        pipe.zremrangebyscore(_LRU_KEY, "-inf", now - Config.GENERATION_CACHE_TTL)
+        pipe.zcard(_LRU_KEY)
+        size = pipe.execute()[-1]
+
+        overflow = size - Config.GENERATION_CACHE_MAX_ENTRIES
+        if overflow > 0:
+            evicted = [member for member, _ in redis_client.zpopmin(_LRU_KEY, overflow)]
+            redis_client.delete(*evicted)
+    except redis.RedisError as e:
+        current_app.logger.warning(f'Generation cache unavailable: {e!r}')
+
+def generation_cache_stats() -> dict:
+    counts = {k.decode(): int(v) for k, v in redis_client.hgetall(_STATS_KEY).items()}
+    by_kind = {}
+    for kind in PROMPT_VERSIONS:
+        hits, misses = counts.get(f"hits:{kind}", 0), counts.get(f"misses:{kind}", 0)
+        by_kind[kind] = {"hits": hits, "misses": misses, "hitRate": hits / (hits + misses) if hits + misses else 0.0}
+    hits = sum(k["hits"] for k in by_kind.values())
+    misses = sum(k["misses"] for k in by_kind.values())
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hitRate": hits / (hits + misses) if hits + misses else 0.0,
+        "size": redis_client.zcount(_LRU_KEY, time.time() - Config.GENERATION_CACHE_TTL, "+inf"),
+        "maxsize": Config.GENERATION_CACHE_MAX_ENTRIES,
+        "byKind": by_kind,
+    }
@@ -0,0 +1,140 @@
+# back_end/utils/lesson_context.py
+
+import json
+import redis
+from flask import current_app
+from back_end.config import Config
+from back_end.extensions.firebase import db, async_db
+from back_end.extensions.redis import redis_client, async_redis_client
+from back_end.utils.cache import TTLLRUCache
+from back_end.utils.embeddings import encode_matrix, decode_matrix
+
+# first tier, per process; Redis is the shared second tier
+context_cache = TTLLRUCache(maxsize=Config.LESSON_CONTEXT_CACHE_SIZE, ttl=Config.LESSON_CONTEXT_TTL)
+
+def _version_key(uid: str, course_id: str) -> str:
+    return f"lessonctx:ver:{uid}:{course_id}"
+
+def _context_key(uid: str, course_id: str, module_id: str, lesson_id: str, version: int) -> str:
+    return f"lessonctx:{uid}:{course_id}:{module_id}:{lesson_id}:{version}"
+
+def _context_refs(client, uid: str, course_id: str, module_id: str, lesson_id: str) -> list:
+    course_ref  = client.collection('users').document(uid).collection('courses').document(course_id)
+    module_ref  = course_ref.collection('modules').document(module_id)
+    lesson_ref  = module_ref.collection('lessons').document(lesson_id)
+    content_ref = lesson_ref.collection('content').document('body')
+    index_ref   = lesson_ref.collection('content').document('index')
+    return [course_ref, module_ref, lesson_ref, content_ref, index_ref]
+
+def _fetch_lesson_context(uid: str, course_id: str, module_id: str, lesson_id: str) -> dict:
+    refs = _context_refs(db, uid, course_id, module_id, lesson_id)
+    # one batched read instead of sequential gets
+    snaps = {snap.reference.path: snap.to_dict() or {} for snap in db.get_all(refs)}
+    return _build_context(refs, snaps)
+
+async def _afetch_lesson_context(uid: str, course_id: str, module_id: str, lesson_id: str) -> dict:
+    refs = _context_refs(async_db, uid, course_id, module_id, lesson_id)
+    snaps = {snap.reference.path: snap.to_dict() or {} async for snap in async_db.get_all(refs)}
+    return _build_context(refs, snaps)
+
+def _build_context(refs: list, snaps: dict) -> dict:
+    course, module, lesson, content, index = (snaps.get(ref.path, {}) for ref in refs)
+
+    return {
+        "topic": course.get('topic'),
+        "moduleTitle": module.get('title'),
+        "lessonTitle": lesson.get('title'),
+        "type": lesson.get('type'),
+        "description": lesson.get('description'),
+        "content": content.get('content'),
+        # retrieval index, if the lesson has been indexed
+        "chunks": index.get('chunks'),
+        "embeddings": encode_matrix(decode_matrix(index['embeddings'], index['dim'])) if index.get('embeddings') else None,
+        "dim": index.get('dim'),
+        "embedder": index.get('embedder'),
+    }
+
+def get_lesson_context(uid: str, course_id: str, module_id: str, lesson_id: str) -> dict:
+    """
+    Course topic, module/lesson titles and lesson content for the chat prompt.
+
+    Entries are keyed by (uid, course, module, lesson) plus a per-course version
+    held in Redis, so bumping the version from any process invalidates both tiers.
+    """
+    try:
+        version = int(redis_client.get(_version_key(uid, course_id)) or 0)
+    except redis.RedisError as e:
+        current_app.logger.warning(f'Lesson context cache unavailable: {e!r}')
+        return _fetch_lesson_context(uid, course_id, module_id, lesson_id)
+
+    key = _context_key(uid, course_id, module_id, lesson_id, version)
+    context = context_cache.get(key)
+    if context is not None:
+        return context
+
+    try:
+        cached = redis_client.get(key)
+    except redis.RedisError:
+        cached = None
+    if cached:
+        context = json.loads(cached)
+        context_cache.set(key, context)
+        return context
+
+    context = _fetch_lesson_context(uid, course_id, module_id, lesson_id)
+    context_cache.set(key, context)
+    try:
+        redis_client.set(key, json.dumps(context), ex=Config.LESSON_CONTEXT_REDIS_TTL)
+    except redis.RedisError:
+        pass
+    return context
+
+async def aget_lesson_context(uid: str, course_id: str, module_id: str, lesson_id: str) -> dict:
+    """
+    get_lesson_context for the async app: same keys and tiers, over the asyncio
+    Redis client and the async Firestore client.
+    """
+    try:
+        version = int(await async_redis_client.get(_version_key(uid, course_id)) or 0)
+    except redis.RedisError as e:
+        current_app.logger.warning(f'Lesson context cache unavailable: {e!r}')
+        return await _afetch_lesson_context(uid, course_id, module_id, lesson_id)
+
+    key = _context_key(uid, course_id, module_id, lesson_id, version)
+    context = context_cache.get(key)
+    if context is not None:
+        return context
+
+    try:
+        cached = await async_redis_client.get(key)
+    except redis.RedisError:
+        cached = None
+    if cached:
+        context = json.loads(cached)
+        context_cache.set(key, context)
+        return context
+
+    context = await _afetch_lesson_context(uid, course_id, module_id, lesson_id)
+    context_cache.set(key, context)
+    try:
+        await async_redis_client.set(key, json.dumps(context), ex=Config.LESSON_CONTEXT_REDIS_TTL)
+    except redis.RedisError:
+        pass
+    return context
+
+def invalidate_lesson_context(uid: str, course_id: str):
+    """
+    Drop every cached lesson context of a course, in every process.
+
+    The version key outlives every entry cached under it, so once it expires and the
+    version starts over from 0 no entry of an earlier version is left to be served.
+    If Redis is unavailable the cached contexts simply age out.
+    """
+    key = _version_key(uid, course_id)
+    try:
+        pipe = redis_client.pipeline()
+        pipe.incr(key)
+        pipe.expire(key, 2 * max(Config.LESSON_CONTEXT_REDIS_TTL, Config.LESSON_CONTEXT_TTL))
+        pipe.execute()
+    except redis.RedisError as e:
+        current_app.logger.warning(f'Could not invalidate lesson context of course {course_id}: {e!r}')
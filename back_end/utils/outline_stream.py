@@ -0,0 +1,78 @@
+# back_end/utils/outline_stream.py
+
+import json
+from typing import List
+
+
+class ModuleStreamParser:
+    """
+    Incremental parser for a streamed CourseOutline JSON document.
+
+    Feed it the raw text chunks as they arrive from the LLM; every time an
+    object inside the top-level "modules" array closes, its decoded dict is
+    returned so the module can be persisted before the rest of the outline
+    has been generated.
+    """
+
+    def __init__(self):
+        self._stack = []          # open containers: '{' or '['
+        self._in_string = False
+        self._escape = False
+        self._string = []         # current root-level string (candidate key)
+        self._last_string = None
+        self._key = None          # last key seen on the root object
+        self._modules_depth = None
+        self._module = None       # chars of the module object being captured
+        self._opened = False      # the root container has been seen
+
+    def feed(self, chunk: str) -> List[dict]:
+        """
+        Consume a chunk of text and return the modules completed by it.
+        """
+        done = []
+        for ch in chunk:
+            if self._module is not None:
+                self._module.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._last_string = "".join(self._string)
+                elif len(self._stack) == 1:
+                    self._string.append(ch)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string = []
+            elif ch == ':' and len(self._stack) == 1:
+                self._key = self._last_string
+            elif ch in '{[':
+                self._stack.append(ch)
+                self._opened = True
+                if ch == '[' and len(self._stack) == 2 and self._key == "modules":
+                    self._modules_depth = len(self._stack)
+                elif ch == '{' and self._modules_depth and len(self._stack) == self._modules_depth + 1:
+                    self._module = ['{']
+            elif ch in '}]':
+                if self._stack:
+                    self._stack.pop()
+                if ch == '}' and self._module is not None and len(self._stack) == self._modules_depth:
+                    done.append(json.loads("".join(self._module)))
+                    self._module = None
+                elif ch == ']' and self._modules_depth and len(self._stack) == self._modules_depth - 1:
+                    self._modules_depth = None
+        return done
+
+    @property
+    def complete(self) -> bool:
+        """
+        True once the root object has closed, i.e. the document wasn't cut off.
+        """
+        return self._opened and not self._stack and not self._in_string
+
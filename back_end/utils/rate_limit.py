@@ -0,0 +1,310 @@
+# back_end/utils/rate_limit.py
+
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+import httpx
+import redis
+from back_end.config import Config
+from back_end.extensions.redis import async_redis_client, redis_client
+
+logger = logging.getLogger(__name__)
+
+# Every OpenRouter request, from any worker or web process, takes a slot here first:
+#   - a token bucket per model for requests/min and tokens/min (LLM_RATE_HEADROOM of the limits),
+#   - an AIMD concurrency limit per model: +1/limit per success (about +1 per round trip),
+#     *LLM_AIMD_DECREASE per 429 unless the request was sent before the last decrease
+#     (one burst of 429s counts once), and a shared pause for the Retry-After period.
+# Timestamps come from the callers (ms); in-flight leases expire so a crashed process can't leak slots.
+
+_ACQUIRE = """
+local bucket, inflight, aimd, pause = KEYS[1], KEYS[2], KEYS[3], KEYS[4]
+local now, rpm, tpm = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local cost, lease, lease_ms = tonumber(ARGV[4]), ARGV[5], tonumber(ARGV[6])
+local start_limit = tonumber(ARGV[7])
+
+local paused = redis.call('PTTL', pause)
+if paused > 0 then return paused end
+
+redis.call('ZREMRANGEBYSCORE', inflight, '-inf', now)
+local limit = tonumber(redis.call('HGET', aimd, 'limit')) or start_limit
+if redis.call('ZCARD', inflight) >= math.floor(limit) then return -1 end
+
+local state = redis.call('HMGET', bucket, 'requests', 'tokens', 'ts')
+local requests, tokens, ts = tonumber(state[1]) or rpm, tonumber(state[2]) or tpm, tonumber(state[3]) or now
+local elapsed = math.max(0, now - ts)
+requests = math.min(rpm, requests + elapsed * rpm / 60000)
+tokens = math.min(tpm, tokens + elapsed * tpm / 60000)
+cost = math.min(cost, tpm)
+
+local wait = 0
+if requests < 1 then wait = math.max(wait, (1 - requests) * 60000 / rpm) end
+if tokens < cost then wait = math.max(wait, (cost - tokens) * 60000 / tpm) end
+if wait == 0 then
+  requests, tokens = requests - 1, tokens - cost
+  redis.call('ZADD', inflight, now + lease_ms, lease)
+  redis.call('PEXPIRE', inflight, lease_ms)
+end
+redis.call('HSET', bucket, 'requests', requests, 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', bucket, 120000)
+return math.ceil(wait)
+"""
+
+_RELEASE = """
+local inflight, aimd, pause = KEYS[1], KEYS[2], KEYS[3]
+local lease, now, outcome = ARGV[1], tonumber(ARGV[2]), ARGV[3]
+local start_limit, min_limit, max_limit = tonumber(ARGV[4]), tonumber(ARGV[5]), tonumber(ARGV[6])
+local decrease, started, retry_after_ms = tonumber(ARGV[7]), tonumber(ARGV[8]), tonumber(ARGV[9])
+
+redis.call('ZREM', inflight, lease)
+local limit = tonumber(redis.call('HGET', aimd, 'limit')) or start_limit
+if outcome == 'ok' then
+  limit = math.min(max_limit, limit + 1 / limit)
+elseif outcome == 'throttled' then
+  if started >= (tonumber(redis.call('HGET', aimd, 'decreased')) or 0) then
+    limit = math.max(min_limit, limit * decrease)
+    redis.call('HSET', aimd, 'decreased', now)
+  end
+  if redis.call('PTTL', pause) < retry_after_ms then
+    redis.call('SET', pause, 1, 'PX', retry_after_ms)
+  end
+end
+redis.call('HSET', aimd, 'limit', limit)
+redis.call('EXPIRE', aimd, 3600)
+return tostring(limit)
+"""
+
+_acquire = redis_client.register_script(_ACQUIRE)
+_release = redis_client.register_script(_RELEASE)
+_aacquire = async_redis_client.register_script(_ACQUIRE)
+_arelease = async_redis_client.register_script(_RELEASE)
+
+_START_LIMIT = max(Config.LLM_MIN_CONCURRENCY, Config.LLM_MAX_CONCURRENCY // 4)
+
+
+def model_limits(model: str) -> tuple[float, float]:
+    """
+    (requests/min, tokens/min) to pace `model` at, i.e. its limits less the headroom.
+    """
+    limits = Config.LLM_RATE_LIMITS.get(model, {})
+    rpm = limits.get("rpm", Config.LLM_REQUESTS_PER_MINUTE)
+    tpm = limits.get("tpm", Config.LLM_TOKENS_PER_MINUTE)
+    return rpm * Config.LLM_RATE_HEADROOM, tpm * Config.LLM_RATE_HEADROOM
+
+def _keys(model: str) -> dict:
+    return {part: f"llm:{part}:{model}" for part in ("bucket", "inflight", "aimd", "pause")}
+
+def request_cost(request: httpx.Request):
+    """
+    (model, estimated tokens) of a chat completion request, or (None, 0) for anything else.
+    Prompt tokens are estimated at 4 bytes each, plus the completion budget.
+    """
+    if request.method != "POST" or not request.url.path.endswith("/chat/completions"):
+        return None, 0
+    try:
+        body = json.loads(request.content)
+    except ValueError:
+        return None, 0
+    completion = body.get("max_completion_tokens") or body.get("max_tokens") or Config.LLM_DEFAULT_COMPLETION_TOKENS
+    return body.get("model"), len(request.content) // 4 + completion
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+def _acquire_args(model: str, cost: int, lease: str) -> tuple[list, list]:
+    keys = _keys(model)
+    rpm, tpm = model_limits(model)
+    return (
+        [keys["bucket"], keys["inflight"], keys["aimd"], keys["pause"]],
+        [_now_ms(), rpm, tpm, cost, lease, Config.LLM_LEASE_SECONDS * 1000, _START_LIMIT],
+    )
+
+def _new_lease() -> str:
+    # "<sent at ms>-<id>", the send time decides whether a 429 still counts for AIMD
+    return f"{_now_ms()}-{uuid.uuid4().hex}"
+
+def _release_args(model: str, lease: str, status_code, retry_after) -> tuple[list, list]:
+    keys = _keys(model)
+    if status_code == 429:
+        outcome = "throttled"
+    elif status_code is not None and status_code < 400:
+        outcome = "ok"
+    else:
+        outcome = "error"
+    try:
+        retry_after_ms = int(float(retry_after) * 1000)
+    except (TypeError, ValueError):
+        retry_after_ms = 1000
+    return (
+        [keys["inflight"], keys["aimd"], keys["pause"]],
+        [lease, _now_ms(), outcome, _START_LIMIT, Config.LLM_MIN_CONCURRENCY, Config.LLM_MAX_CONCURRENCY,
+         Config.LLM_AIMD_DECREASE, int(lease.split("-", 1)[0]), retry_after_ms],
+    )
+
+def _backoff(wait_ms: int) -> float:
+    # -1: no concurrency slot free, poll again shortly; cap waits so a freed slot is noticed
+    seconds = 0.05 if wait_ms < 0 else min(wait_ms / 1000, 1.0)
+    return seconds * random.uniform(1.0, 1.5)
+
+
+def acquire(model: str, cost: int):
+    """
+    Block until `model` has a free slot and budget for `cost` tokens; returns the lease
+    to pass to release(). Fails open (returns None) if Redis is unavailable.
+    """
+    deadline = time.monotonic() + Config.LLM_RATE_LIMIT_TIMEOUT
+    while True:
+        lease = _new_lease()
+        try:
+            wait_ms = _acquire(*_acquire_args(model, cost, lease))
+        except redis.RedisError:
+            logger.warning("LLM rate limiter unavailable, calling %s unthrottled", model, exc_info=True)
+            return None
+        if wait_ms == 0:
+            return lease
+        if time.monotonic() > deadline:
+            raise httpx.PoolTimeout(f"no OpenRouter capacity for {model} within {Config.LLM_RATE_LIMIT_TIMEOUT}s")
+        time.sleep(_backoff(wait_ms))
+
+def release(model: str, lease, status_code=None, retry_after=None):
+    """
+    Free the slot and feed the outcome (HTTP status, None for a transport error) back into AIMD.
+    """
+    if lease is None:
+        return
+    try:
+        _release(*_release_args(model, lease, status_code, retry_after))
+    except redis.RedisError:
+        pass
+
+async def aacquire(model: str, cost: int):
+    deadline = time.monotonic() + Config.LLM_RATE_LIMIT_TIMEOUT
+    while True:
+        lease = _new_lease()
+        try:
+            wait_ms = await _aacquire(*_acquire_args(model, cost, lease))
+        except redis.RedisError:
+            logger.warning("LLM rate limiter unavailable, calling %s unthrottled", model, exc_info=True)
+            return None
+        if wait_ms == 0:
+            return lease
+        if time.monotonic() > deadline:
+            raise httpx.PoolTimeout(f"no OpenRouter capacity for {model} within {Config.LLM_RATE_LIMIT_TIMEOUT}s")
+        await asyncio.sleep(_backoff(wait_ms))
+
+async def arelease(model: str, lease, status_code=None, retry_after=None):
+    if lease is None:
+        return
+    try:
+        await _arelease(*_release_args(model, lease, status_code, retry_after))
+    except redis.RedisError:
+        pass
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """
+    Response body that gives the slot back once it has been read or closed, so a
+    streamed completion holds its slot for as long as it is streaming.
+    """
+
+    def __init__(self, stream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            if self._on_close:
+                self._on_close()
+                self._on_close = None
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+
+    def __init__(self, stream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._on_close:
+                await self._on_close()
+                self._on_close = None
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """
+    httpx transport that paces chat completion requests through the shared limiter.
+    Wraps the OpenRouter client, so every ChatOpenAI (and agent) call goes through it.
+    """
+
+    def __init__(self, transport: httpx.BaseTransport):
+        self._transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        model, cost = request_cost(request)
+        if model is None:
+            return self._transport.handle_request(request)
+
+        lease = acquire(model, cost)
+        try:
+            response = self._transport.handle_request(request)
+        except BaseException:
+            release(model, lease)
+            raise
+        status_code, retry_after = response.status_code, response.headers.get("retry-after")
+        if response.is_closed:  # body already in memory
+            release(model, lease, status_code, retry_after)
+            return response
+        response.stream = _ReleasingStream(
+            response.stream, lambda: release(model, lease, status_code, retry_after)
+        )
+        return response
+
+    def close(self):
+        self._transport.close()
+
+
+class AsyncRateLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    Async counterpart of RateLimitedTransport (for back_end/asgi.py).
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        model, cost = request_cost(request)
+        if model is None:
+            return await self._transport.handle_async_request(request)
+
+        lease = await aacquire(model, cost)
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            await arelease(model, lease)
+            raise
+        status_code, retry_after = response.status_code, response.headers.get("retry-after")
+        if response.is_closed:
+            await arelease(model, lease, status_code, retry_after)
+            return response
+        response.stream = _AsyncReleasingStream(
+            response.stream, lambda: arelease(model, lease, status_code, retry_after)
+        )
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
@@ -0,0 +1,167 @@
+# back_end/utils/sse.py
+
+import asyncio
+import json
+import queue
+import threading
+import time
+
+
+def sse_event(event: str, data) -> bytes:
+    """
+    One Server-Sent Event with a JSON payload.
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+SSE_HEARTBEAT = b": heartbeat\n\n"
+
+
+class BackgroundStream:
+    """
+    Drains a blocking iterator (e.g. llm.stream(...)) on a daemon thread, so the
+    consumer can wait with a timeout (to coalesce or send heartbeats) and can
+    cancel the upstream stream when the client goes away.
+    """
+
+    ITEM, TIMEOUT, ERROR, END = "item", "timeout", "error", "end"
+
+    def __init__(self, iterator):
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(iterator,), daemon=True)
+        self._thread.start()
+
+    def _run(self, iterator):
+        try:
+            for item in iterator:
+                if self._stop.is_set():
+                    break
+                self._queue.put((self.ITEM, item))
+        except Exception as e:
+            self._queue.put((self.ERROR, e))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close:
+                close()
+            self._queue.put((self.END, None))
+
+    def get(self, timeout: float):
+        try:
+            return self._queue.get(timeout=max(timeout, 0))
+        except queue.Empty:
+            return self.TIMEOUT, None
+
+    def cancel(self):
+        """
+        Stop pulling from upstream; the iterator is closed after its next item.
+        """
+        self._stop.set()
+
+
+class EventCoalescer:
+    """
+    Turns LLM chunks into SSE bytes: text is buffered for up to `window` seconds or
+    `max_chars` characters per 'delta' event, a heartbeat comment is due after
+    `heartbeat` idle seconds, and the final token usage becomes a 'usage' event.
+    """
+
+    def __init__(self, window: float, max_chars: int, heartbeat: float, on_text=None):
+        self.window = window
+        self.max_chars = max_chars
+        self.heartbeat = heartbeat
+        self.on_text = on_text
+        self.buffer, self.size, self.usage = [], 0, None
+        self.buffered_at = self.sent_at = time.monotonic()
+
+    def timeout(self) -> float:
+        """
+        Seconds until the buffer must be flushed, or until the next heartbeat.
+        """
+        now = time.monotonic()
+        if self.buffer:
+            return self.buffered_at + self.window - now
+        return self.sent_at + self.heartbeat - now
+
+    def add(self, chunk) -> list[bytes]:
+        if getattr(chunk, "usage_metadata", None):
+            self.usage = chunk.usage_metadata
+        if not chunk.content:
+            return []
+        if not self.buffer:
+            self.buffered_at = time.monotonic()
+        self.buffer.append(chunk.content)
+        self.size += len(chunk.content)
+        if self.on_text:
+            self.on_text(chunk.content)
+        return [self.flush()] if self.size >= self.max_chars else []
+
+    def flush(self) -> bytes:
+        text = "".join(self.buffer)
+        self.buffer, self.size, self.sent_at = [], 0, time.monotonic()
+        return sse_event("delta", {"text": text})
+
+    def tick(self) -> bytes:
+        """
+        Called when timeout() elapsed without a chunk: flush, or send a heartbeat.
+        """
+        if self.buffer:
+            return self.flush()
+        self.sent_at = time.monotonic()
+        return SSE_HEARTBEAT
+
+    def close(self) -> list[bytes]:
+        events = [self.flush()] if self.buffer else []
+        if self.usage:
+            events.append(sse_event("usage", dict(self.usage)))
+        return events
+
+
+def coalesced_events(stream: BackgroundStream, window: float, max_chars: int, heartbeat: float, on_text=None):
+    """
+    SSE bytes for the chunks of a BackgroundStream (see EventCoalescer).
+    """
+    events = EventCoalescer(window, max_chars, heartbeat, on_text)
+    while True:
+        kind, chunk = stream.get(timeout=events.timeout())
+        if kind == stream.ITEM:
+            yield from events.add(chunk)
+        elif kind == stream.TIMEOUT:
+            yield events.tick()
+        elif kind == stream.ERROR:
+            raise chunk
+        else:
+            break
+    yield from events.close()
+
+
+async def acoalesced_events(chunks, window: float, max_chars: int, heartbeat: float, on_text=None):
+    """
+    SSE bytes for an async iterator of chunks (e.g. llm.astream(...)), see EventCoalescer.
+    If the consumer is cancelled (client disconnect), the pending read is cancelled,
+    which aborts the upstream request.
+    """
+    events = EventCoalescer(window, max_chars, heartbeat, on_text)
+    iterator = chunks.__aiter__()
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            done, _ = await asyncio.wait({pending}, timeout=max(events.timeout(), 0))
+            if not done:
+                yield events.tick()
+                continue
+            next_chunk, pending = pending, None
+            try:
+                chunk = next_chunk.result()
+            except StopAsyncIteration:
+                break
+            for event in events.add(chunk):
+                yield event
+        for event in events.close():
+            yield event
+    finally:
+        if pending is not None:
+            pending.cancel()
+        elif hasattr(iterator, "aclose"):
+            asyncio.ensure_future(iterator.aclose())
@@ -0,0 +1,52 @@
+# back_end/utils/task_registry.py
+
+from back_end.celery_app import celery
+from back_end.config import Config
+from back_end.extensions.redis import redis_client
+
+
+class GenerationCancelled(Exception):
+    """Raised inside a generation task once its course has been cancelled."""
+
+
+def _tasks_key(uid: str, course_id: str) -> str:
+    return f"course:{uid}:{course_id}:tasks"
+
+def _cancel_key(uid: str, course_id: str) -> str:
+    return f"course:{uid}:{course_id}:cancelled"
+
+def register_tasks(uid: str, course_id: str, task_ids: list[str]):
+    """
+    Remember the Celery task ids dispatched for a course so they can be revoked later.
+    """
+    if not task_ids:
+        return
+    key = _tasks_key(uid, course_id)
+    pipe = redis_client.pipeline()
+    pipe.sadd(key, *task_ids)
+    pipe.expire(key, Config.COURSE_TASKS_TTL)
+    pipe.execute()
+
+def is_cancelled(uid: str, course_id: str) -> bool:
+    return bool(redis_client.exists(_cancel_key(uid, course_id)))
+
+def clear_cancelled(uid: str, course_id: str):
+    redis_client.delete(_cancel_key(uid, course_id))
+
+def raise_if_cancelled(uid: str, course_id: str):
+    if is_cancelled(uid, course_id):
+        raise GenerationCancelled(f"Generation of course {course_id} was cancelled")
+
+def cancel_course(uid: str, course_id: str) -> int:
+    """
+    Flag the course as cancelled and revoke every registered task that hasn't started yet.
+    Running tasks notice the flag between agent steps. Returns the number of revoked ids.
+    """
+    redis_client.set(_cancel_key(uid, course_id), 1, ex=Config.COURSE_TASKS_TTL)
+
+    key = _tasks_key(uid, course_id)
+    task_ids = [task_id.decode() for task_id in redis_client.smembers(key)]
+    if task_ids:
+        celery.control.revoke(task_ids)
+    redis_client.delete(key)
+    return len(task_ids)
@@ -0,0 +1,14 @@
+# back_end/utils/tokens.py
+
+from functools import lru_cache
+import tiktoken
+
+@lru_cache(maxsize=1)
+def _encoding():
+    return tiktoken.get_encoding("cl100k_base")
+
+def count_tokens(text: str) -> int:
+    """
+    Approximate prompt tokens of `text` (cl100k_base; close enough for budgeting any chat model).
+    """
+    return len(_encoding().encode(text or "", disallowed_special=()))
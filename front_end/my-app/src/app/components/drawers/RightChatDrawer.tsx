@@ -69,6 +69,8 @@ export default function RightChatDrawer({ children, reference }: RightChatDrawer
   const theme = useTheme();
 
   const assistantContentRef = useRef('');
+  // history is kept server-side per session; only the new message is sent
+  const sessionIdRef = useRef<string>(crypto.randomUUID());
 
   const drawerRef = useRef(null);
   const [width, setWidth] = useState(0);
@@ -123,9 +125,10 @@ export default function RightChatDrawer({ children, reference }: RightChatDrawer
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'Accept': 'text/event-stream',
           'Authorization': `Bearer ${token}`,
         },
-        body: JSON.stringify({ messages: [...messages, userMessage], reference }),
+        body: JSON.stringify({ sessionId: sessionIdRef.current, message: userMessage.text, reference }),
       });
 
       if (!response.ok || !response.body) throw new Error();
@@ -133,13 +136,26 @@ export default function RightChatDrawer({ children, reference }: RightChatDrawer
       assistantContentRef.current = '';
       const reader = response.body.getReader();
       const decoder = new TextDecoder();
+      let buffered = '';
       let done = false;
 
       while (!done) {
         const { value, done: doneReading } = await reader.read();
         done = doneReading;
-        const chunk = decoder.decode(value);
-        assistantContentRef.current += chunk;
+        buffered += decoder.decode(value, { stream: !done });
+
+        // Server-Sent Events are separated by a blank line; keep any partial event for the next read
+        const events = buffered.split('\n\n');
+        buffered = events.pop() ?? '';
+        for (const raw of events) {
+          const event = raw.match(/^event: (.*)$/m)?.[1];
+          const data = raw.match(/^data: (.*)$/m)?.[1];
+          if (event === 'delta' && data) {
+            assistantContentRef.current += JSON.parse(data).text;
+          } else if (event === 'error') {
+            throw new Error();
+          }
+        }
 
         setMessages((msgs) => {
           const tmp = [...msgs];
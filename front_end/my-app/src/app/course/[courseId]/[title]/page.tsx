@@ -83,6 +83,8 @@ interface ReadingJson {
   content: string;
   completed: boolean;
   citations: { [key: string]: any }[];
+  partial?: boolean; // still being generated
+  status?: string; // the lesson's generation status
 }
 
 interface AssignmentJson {
@@ -107,6 +109,9 @@ interface VideoJson {
   content: VideoContentProps;
 }
 
+// lessons in these states have no content yet; they're polled until they do
+const GENERATING_STATUSES = ['deferred', 'pending', 'generating'];
+
 interface Lesson {
   id: string;
   title: string;
@@ -153,6 +158,7 @@ export default function CoursePage() {
     lessonType: null,
   });
   const [videoJson, setVideoJson] = useState<VideoJson | null>(null);
+  const [generatingLesson, setGeneratingLesson] = useState<{ title: string; status?: string } | null>(null);
   const [mobileOpen, setMobileOpen] = useState(false);
 
   const [isResizing, setIsResizing] = useState(false);
@@ -276,6 +282,24 @@ export default function CoursePage() {
 
 
 
+  // route a fetched lesson to its page, or to the "being generated" state until it has content
+  const showLesson = (data: any) => {
+    if (GENERATING_STATUSES.includes(data.status) && !data.partial) {
+      setGeneratingLesson(data);
+      return;
+    }
+    setGeneratingLesson(null);
+    if (data.type === "reading") {
+      setReadingJson(data);
+    } else if (data.type === "test" || data.type === "unit test") {
+      setTestJson(data);
+    } else if (data.type === "video") {
+      setVideoJson(data);
+    } else if (data.type === "assignment") {
+      setAssignmentJson(data);
+    }
+  };
+
   // fetch single lesson content
   const fetchLessonContent = async (moduleId: string, lessonId: string) => {
     if (loading) return;  
@@ -285,6 +309,7 @@ export default function CoursePage() {
       setTestJson(null);
       setVideoJson(null);
       setAssignmentJson(null);
+      setGeneratingLesson(null);
       setChatReference(null);
       const { data } = await api.get(
         `/retrieve/courses/${courseId}/modules/${moduleId}/lessons/${lessonId}`
@@ -294,15 +319,7 @@ export default function CoursePage() {
         lessonTitle: data.title,
         lessonType: data.type,
       });
-      if (data.type === "reading") {
-        setReadingJson(data);
-      } else if (data.type === "test" || data.type === "unit test") {
-        setTestJson(data);
-      } else if (data.type === "video") {
-        setVideoJson(data);
-      } else if (data.type === "assignment") {
-        setAssignmentJson(data);
-      }
+      showLesson(data);
       setSelectedLesson({ moduleId, lessonId });
       setOpenModuleIds(prev =>
         prev.includes(moduleId)
@@ -346,6 +363,47 @@ export default function CoursePage() {
     }
   }, [selectedLesson.moduleId]);
 
+  // a reading that is still being generated is refreshed until it is complete (or stopped)
+  useEffect(() => {
+    const { moduleId, lessonId } = selectedLesson;
+    const stopped = readingJson?.status === 'failed' || readingJson?.status === 'cancelled';
+    if (!readingJson?.partial || stopped || !moduleId || !lessonId) return;
+    const timer = setTimeout(async () => {
+      try {
+        const { data } = await api.get(
+          `/retrieve/courses/${courseId}/modules/${moduleId}/lessons/${lessonId}`
+        );
+        // unless the user moved on to another lesson meanwhile
+        setReadingJson(current => (current === readingJson ? data : current));
+      } catch (err) {
+        console.error("Error refreshing lesson:", err);
+      }
+    }, 2000);
+    return () => clearTimeout(timer);
+  }, [readingJson, selectedLesson]);
+
+  // likewise a lesson that hasn't been generated yet (or is queued behind the first module)
+  useEffect(() => {
+    const { moduleId, lessonId } = selectedLesson;
+    if (!generatingLesson || !moduleId || !lessonId) return;
+    let stale = false;
+    const timer = setTimeout(async () => {
+      try {
+        const { data } = await api.get(
+          `/retrieve/courses/${courseId}/modules/${moduleId}/lessons/${lessonId}`
+        );
+        // unless the user moved on to another lesson meanwhile
+        if (!stale) showLesson(data);
+      } catch (err) {
+        console.error("Error refreshing lesson:", err);
+      }
+    }, 3000);
+    return () => {
+      stale = true;
+      clearTimeout(timer);
+    };
+  }, [generatingLesson, selectedLesson]);
+
 
   const handleModuleClick = (modId: string) => {
     setOpenModuleIds((prev) =>
@@ -562,6 +620,23 @@ export default function CoursePage() {
               <LoadingAnimationComponent />
             </Box>
           )}
+          {generatingLesson && (
+            <Box sx={{
+              display: 'flex',
+              flexDirection: 'column',
+              alignItems: 'center',
+              justifyContent: 'center',
+              gap: 2,
+              height: 'calc(100vh - 72px)',
+            }}>
+              <LoadingAnimationComponent />
+              <Typography color="text.secondary">
+                {generatingLesson.status === 'generating'
+                  ? `"${generatingLesson.title}" is being generated...`
+                  : `"${generatingLesson.title}" is queued for generation...`}
+              </Typography>
+            </Box>
+          )}
           {readingJson && (
             <ReadingPage readingJson={readingJson} handleComplete={handleComplete}/>
           )}
@@ -42,12 +42,25 @@ type Course = {
   topic: string;
   uid: string;
   totalLessons: number;
+  releasedLessons?: number; // lazy courses generate only these so far
   status: string;
   generatedLessons: number;
   completedLessons: number;
   deleted: boolean;
 }
 
+// Courses carry a status lifecycle (outlining -> generating -> ready/failed);
+// older courses without one fall back to comparing the progress counters.
+const isGenerating = ({ status, totalLessons, generatedLessons }: Course) =>
+  status
+    ? status === 'outlining' || status === 'generating'
+    : totalLessons !== generatedLessons;
+
+// A course whose outline never made it has nothing to show; one with failed
+// lessons stays listed so they can be regenerated.
+const isFailedOutline = ({ status, totalLessons }: Course) =>
+  status === 'failed' && !totalLessons;
+
 export default function Dashboard() {
   const [userCourses, setUserCourses] = useState<Course[]>([]);
   const [user, setUser] = useState<User | null>(null);
@@ -133,7 +146,7 @@ export default function Dashboard() {
         </Typography>
       </Box>
 
-      {userCourses.some(c => c.totalLessons !== c.generatedLessons) && (
+      {userCourses.some(c => isGenerating(c) && c.deleted === false) && (
        <>
         <Divider sx={{ mb: 3, mt: 6 }} />
         <Box
@@ -150,10 +163,10 @@ export default function Dashboard() {
           <Stack spacing={2}>
             {userCourses
               .filter(
-                ({ totalLessons, generatedLessons, deleted }) =>
-                  totalLessons !== generatedLessons && deleted === false
+                (course) => isGenerating(course) && course.deleted === false
               )
-              .map(({ id, title, createdAt, topic, totalLessons, generatedLessons }) => {
+              .map(({ id, title, createdAt, topic, totalLessons, releasedLessons, generatedLessons }) => {
+                const generating = releasedLessons ?? totalLessons;
                 return (
                   <Paper
                     key={id}
@@ -195,13 +208,13 @@ export default function Dashboard() {
                         fontSize: '1.8rem',
                         fontWeight: 600, 
                       }}>
-                        {Math.floor((generatedLessons / totalLessons) * 100)}%
+                        {generating ? Math.floor((generatedLessons / generating) * 100) : 0}%
                       </Typography>
                     </Box>
 
                     <LinearProgress
                       variant="determinate"
-                      value={(generatedLessons / totalLessons) * 100}
+                      value={generating ? (generatedLessons / generating) * 100 : 0}
                       sx={{
                         height: 8,
                         borderRadius: 999,
@@ -237,10 +250,11 @@ export default function Dashboard() {
 
         {(() => {
           const inProgress = userCourses.filter(
-            ({ totalLessons, generatedLessons, deleted, completedLessons }) =>
-              totalLessons === generatedLessons &&
-              deleted === false &&
-              totalLessons !== completedLessons
+            (course) =>
+              !isGenerating(course) &&
+              !isFailedOutline(course) &&
+              course.deleted === false &&
+              course.totalLessons !== course.completedLessons
           );
 
           if (inProgress.length === 0) {
@@ -373,10 +387,11 @@ export default function Dashboard() {
         <Stack spacing={2}>
           {(() => {
             const completedCourses = userCourses.filter(
-              ({ totalLessons, generatedLessons, deleted, completedLessons }) =>
-                totalLessons === generatedLessons &&
-                deleted === false &&
-                totalLessons === completedLessons
+              (course) =>
+                !isGenerating(course) &&
+                !isFailedOutline(course) &&
+                course.deleted === false &&
+                course.totalLessons === course.completedLessons
             );
 
             if (completedCourses.length === 0) {